@@ -0,0 +1,6 @@
+import requests
+
+# 모델 서버 요청이 공유하는 keep-alive 세션 (요청마다 TCP 연결을 새로 맺지 않음)
+# 연결 풀은 호스트별로 따로 잡히며, reranker의 score_batch가 최대 32개를 동시에 보낸다
+session = requests.Session()
+session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=32))
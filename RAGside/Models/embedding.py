@@ -1,7 +1,8 @@
 import numpy as np
-import requests
 import json
 
+from ._http import session
+
 
 server_url = "http://inputnameplz.iptime.org:12347"  # vLLM 서버 주소
 model_name = "Qwen/Qwen3-Embedding-0.6B"  # 사용하는 임베딩 모델명
@@ -19,7 +20,7 @@ def Embedding(texts):
         "Content-Type": "application/json"
     }
     
-    response = requests.post(url, json=payload, headers=headers)
+    response = session.post(url, json=payload, headers=headers)
     
     if response.status_code == 200:
         result = response.json()
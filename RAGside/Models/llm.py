@@ -1,5 +1,5 @@
 
-import requests
+from ._http import session
 
 base_model_url = "http://inputnameplz.iptime.org:12345/v1/chat/completions"
 mini_model_url = "http://inputnameplz.iptime.org:12346/v1/chat/completions"
@@ -18,7 +18,7 @@ def LLM(message):
         "Content-Type": "application/json"
     }
 
-    response = requests.post(base_model_url, json=data, headers=headers)
+    response = session.post(base_model_url, json=data, headers=headers)
 
     if response.status_code == 200:
         result = response.json()["choices"][0]["message"]["content"]
@@ -41,7 +41,7 @@ def LLM_small(message):
         "Content-Type": "application/json"
     }
 
-    response = requests.post(base_model_url, json=data, headers=headers)
+    response = session.post(base_model_url, json=data, headers=headers)
 
     if response.status_code == 200:
         result = response.json()["choices"][0]["message"]["content"]
@@ -65,7 +65,7 @@ def structured_LLM(message, schema):
         "Content-Type": "application/json"
     }
 
-    response = requests.post(base_model_url, json=data, headers=headers)
+    response = session.post(base_model_url, json=data, headers=headers)
 
     if response.status_code == 200:
         result = response.json()["choices"][0]["message"]["content"]
@@ -1,4 +1,44 @@
-import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from ._http import session
+
+rerank_url = "http://inputnameplz.iptime.org:12346/v1/chat/completions"
+
+
+def _score(query, doc):
+    """query와 document 하나의 연관성 점수를 LLM으로 평가 (실패시 0점)"""
+    prompt = f"Rate the relevance between the query and context with a number.\nquery: {query}\ncontext: {doc}\nOutput only a single number."
+    message_data = {
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 3,
+        "temperature": 0
+    }
+    headers = {
+        "Content-Type": "application/json"
+    }
+    
+    response = session.post(rerank_url, json=message_data, headers=headers)
+    if response.status_code != 200:
+        return 0.0
+    
+    result = response.json()["choices"][0]["message"]["content"].strip()
+    try:
+        # 숫자만 추출하여 점수로 사용
+        return float(result)
+    except ValueError:
+        # 숫자로 변환 실패 시 0점 처리
+        return 0.0
+
+
+def score_batch(query, documents, max_batch=32):
+    """
+    documents 전체의 점수를 documents와 같은 순서로 반환
+    한 번에 최대 max_batch개의 요청을 동시에 보낸다 (문서 N개 → 약 ceil(N/max_batch)번의 왕복 시간)
+    """
+    if not documents:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_batch, len(documents))) as executor:
+        return list(executor.map(lambda doc: _score(query, doc), documents))
 
 
 def Reranker(query, documents, top_n=None):
@@ -6,43 +46,11 @@ def Reranker(query, documents, top_n=None):
     LLM을 이용한 reranker 함수
     query와 각 document의 연관성을 LLM으로 평가하여 점수를 반환
     """
-    rerank_url = "http://inputnameplz.iptime.org:12346/v1/chat/completions"
-    
-    # 각 document에 대한 프롬프트 생성
-    batch_messages = []
-    for doc in documents:
-        prompt = f"Rate the relevance between the query and context with a number.\nquery: {query}\ncontext: {doc}\nOutput only a single number."
-        batch_messages.append({
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": 3,
-            "temperature": 0
-        })
-    
-    headers = {
-        "Content-Type": "application/json"
-    }
-    
-    # 배치 요청 전송 (각각 개별 요청으로 처리)
-    scores = []
-    for message_data in batch_messages:
-        response = requests.post(rerank_url, json=message_data, headers=headers)
-        
-        if response.status_code == 200:
-            result = response.json()["choices"][0]["message"]["content"].strip()
-            print(result)
-            try:
-                # 숫자만 추출하여 점수로 사용
-                score = float(result)
-                scores.append(score)
-            except ValueError:
-                # 숫자로 변환 실패 시 0점 처리
-                scores.append(0.0)
-        else:
-            scores.append(0.0)
+    scores = score_batch(query, documents)
     
-    # 점수와 문서 인덱스를 함께 정렬
+    # 점수 내림차순으로 정렬, 점수가 같으면 입력 순서(검색 순위) 유지
     scored_docs = list(enumerate(scores))
-    scored_docs.sort(key=lambda x: x[1], reverse=True)
+    scored_docs.sort(key=lambda x: (-x[1], x[0]))
     
     # top_n이 지정된 경우 상위 n개만 반환
     if top_n is not None:
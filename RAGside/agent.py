@@ -8,6 +8,56 @@ from Models.llm import structured_LLM
 from retriever import FileRetriever
 
 
+# 모드별 지침 프롬프트 템플릿 (호출마다 f-string을 새로 만들지 않고 format_map으로 채움)
+NORMAL_INSTRUCTION = """
+빠른 답변 모드입니다. 현재 정보로 답변하세요.
+- answer: 핵심을 담은 답변
+- need_more: 이 항목은 *반드시* false 로 답변
+- next_query: "" 이 항목은 *반드시* 빈 문자열로 답변
+"""
+DEEP_FINAL_TEMPLATE = """
+마지막 단계({iteration}회차)입니다. 수집된 정보로 최종 답변하세요.
+- answer: 종합적인 최종 답변 또는 "정보 부족으로 답변 어려움" 명시
+- need_more: 이 항목은 *반드시* false 로 답변
+- next_query: "" 이 항목은 *반드시* 빈 문자열로 답변
+"""
+DEEP_TEMPLATE = """
+균형잡힌 탐색 모드 {iteration}회차입니다. 정보가 충분한지 판단하세요.
+- answer: 현재 분석 결과나 중간 답변
+- need_more: 더 검색이 필요하면 true, 충분하면 false
+- next_query: 필요시 다음 검색어, 불필요하면 ""
+"""
+DEEPER_FINAL_TEMPLATE = """
+심층 분석 최종 단계({iteration}회차)입니다. 모든 정보를 종합하여 완전한 답변하세요.
+- answer: 심층 분석을 통한 완전한 최종 답변
+- need_more: false
+- next_query: ""
+"""
+DEEPER_TEMPLATE = """
+심층 분석 모드 {iteration}회차 - {strategy}
+현재 단계 목표에 맞게 추가 탐색이 필요한지 판단하세요.
+- answer: 현재까지의 분석 내용
+- need_more: 목표 달성을 위해 더 필요하면 true
+- next_query: 다음 단계에 맞는 새로운 관점의 검색어
+"""
+DEEPER_STRATEGIES = {
+    1: "기초 정보 수집",
+    2: "세부 정보 탐색", 
+    3: "맥락 및 배경 확장",
+    4: "다각적 관점 확보",
+    5: "정보 검증 및 종합"
+}
+PROMPT_TEMPLATE = """
+사용자 질문: {user_input}
+현재까지 수집된 정보:
+{context}
+
+{instruction}
+
+중요: 오직 검색된 정보만 사용하고, 추측하지 마세요.
+JSON 형식으로 정확히 응답하세요."""
+
+
 class RAGAgent:
     """RAG 시스템을 이용한 에이전트"""
     
@@ -71,9 +121,8 @@ class RAGAgent:
             }
             
             if search_results:
-                # 딕셔너리 형태의 검색 결과에서 텍스트만 추출하여 컨텍스트 구성
-                context_texts = [result['text'] for result in search_results]
-                new_context = "\n".join(context_texts)
+                # 딕셔너리 형태의 검색 결과에서 텍스트만 추출하여 컨텍스트 구성 (중간 리스트 없이 join)
+                new_context = "\n".join(result['text'] for result in search_results)
                 accumulated_context += f"\n\n=== 검색 결과 {iteration} ===\n{new_context}"
                 print(f"✅ {len(search_results)}개 문서 조각 발견")
             else:
@@ -143,67 +192,20 @@ class RAGAgent:
     
     def _build_prompt(self, user_input: str, context: str, iteration: int, is_final: bool) -> str:
         """모드별 최적화된 프롬프트 생성"""
-        
-        # 기본 정보
-        base_info = f"""
-사용자 질문: {user_input}
-현재까지 수집된 정보:
-{context if context else "아직 수집된 정보가 없습니다."}
-"""
-        
-        # 모드별 지침
+        fields = {"iteration": iteration}
         if self.mode == "normal":
-            instruction = """
-빠른 답변 모드입니다. 현재 정보로 답변하세요.
-- answer: 핵심을 담은 답변
-- need_more: 이 항목은 *반드시* false 로 답변
-- next_query: "" 이 항목은 *반드시* 빈 문자열로 답변
-"""
+            instruction = NORMAL_INSTRUCTION
         elif self.mode == "deep":
-            if is_final:
-                instruction = f"""
-마지막 단계({iteration}회차)입니다. 수집된 정보로 최종 답변하세요.
-- answer: 종합적인 최종 답변 또는 "정보 부족으로 답변 어려움" 명시
-- need_more: 이 항목은 *반드시* false 로 답변
-- next_query: "" 이 항목은 *반드시* 빈 문자열로 답변
-"""
-            else:
-                instruction = f"""
-균형잡힌 탐색 모드 {iteration}회차입니다. 정보가 충분한지 판단하세요.
-- answer: 현재 분석 결과나 중간 답변
-- need_more: 더 검색이 필요하면 true, 충분하면 false
-- next_query: 필요시 다음 검색어, 불필요하면 ""
-"""
+            instruction = DEEP_FINAL_TEMPLATE if is_final else DEEP_TEMPLATE
         else:  # deeper
-            strategies = {
-                1: "기초 정보 수집",
-                2: "세부 정보 탐색", 
-                3: "맥락 및 배경 확장",
-                4: "다각적 관점 확보",
-                5: "정보 검증 및 종합"
-            }
-            current_strategy = strategies.get(iteration, "종합 분석")
-            
-            if is_final:
-                instruction = f"""
-심층 분석 최종 단계({iteration}회차)입니다. 모든 정보를 종합하여 완전한 답변하세요.
-- answer: 심층 분석을 통한 완전한 최종 답변
-- need_more: false
-- next_query: ""
-"""
-            else:
-                instruction = f"""
-심층 분석 모드 {iteration}회차 - {current_strategy}
-현재 단계 목표에 맞게 추가 탐색이 필요한지 판단하세요.
-- answer: 현재까지의 분석 내용
-- need_more: 목표 달성을 위해 더 필요하면 true
-- next_query: 다음 단계에 맞는 새로운 관점의 검색어
-"""
+            fields["strategy"] = DEEPER_STRATEGIES.get(iteration, "종합 분석")
+            instruction = DEEPER_FINAL_TEMPLATE if is_final else DEEPER_TEMPLATE
         
-        return base_info + "\n" + instruction + """
-
-중요: 오직 검색된 정보만 사용하고, 추측하지 마세요.
-JSON 형식으로 정확히 응답하세요."""
+        return PROMPT_TEMPLATE.format_map({
+            "user_input": user_input,
+            "context": context if context else "아직 수집된 정보가 없습니다.",
+            "instruction": instruction.format_map(fields),
+        })
     
     def _show_referenced_chunks(self, chunks: list):
         if not chunks:
@@ -1,29 +1,99 @@
+import logging
+import threading
+
 import chromadb
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CHROMA_HOST = 'localhost'
+CHROMA_PORT = 8000
+COLLECTION_NAME = "sentences"
+
+# (host, port) -> client, (host, port, name) -> collection
+# 프로세스 안에서 client/collection은 처음 사용할 때 한 번만 만들고 재사용한다
+_CLIENT_CACHE = {}
+_COLL_CACHE = {}
+_cache_lock = threading.Lock()
+
+def get_collection(host=CHROMA_HOST, port=CHROMA_PORT, name=COLLECTION_NAME):
+    """캐시된 Chroma collection을 반환 (없으면 client/collection을 생성)"""
+    key = (host, port, name)
+    coll = _COLL_CACHE.get(key)
+    if coll is not None:
+        return coll
+    with _cache_lock:
+        coll = _COLL_CACHE.get(key)
+        if coll is None:
+            client = _CLIENT_CACHE.get((host, port))
+            if client is None:
+                client = _CLIENT_CACHE[(host, port)] = chromadb.HttpClient(host=host, port=port)
+            # 저장되는 벡터는 모두 L2 정규화(unit-norm)되어 있으므로 cosine 유사도가 내적(ip)과 같다.
+            # 이후 코드에서 다시 정규화할 필요 없음
+            coll = client.get_or_create_collection(name, metadata={"hnsw:space": "ip"})
+            # 정규화 이전에 만든 collection(기본 l2)에는 정규화되지 않은 벡터가 남아 있어
+            # 새로 저장한 벡터와 거리를 비교할 수 없으므로 사용하지 않음 (collection을 지우고 다시 색인해야 함)
+            space = (coll.metadata or {}).get("hnsw:space", "l2")
+            if space != "ip":
+                logger.warning("⚠️ collection '%s'의 거리 공간이 %s입니다. 삭제 후 다시 색인해야 합니다", name, space)
+                raise RuntimeError(f"collection '{name}' uses hnsw:space={space}, expected ip")
+            _COLL_CACHE[key] = coll
+        return coll
+
+def normalize(vector):
+    """벡터를 L2 정규화하여 리스트로 반환"""
+    # 캐시된 float32 배열이 들어올 수 있으므로 제자리(in-place)로 나누지 않음
+    v = np.asarray(vector, dtype=np.float32)
+    return (v / (np.linalg.norm(v) + 1e-12)).tolist()
 
-client = chromadb.HttpClient(host='localhost', port=8000)
-collection = client.get_or_create_collection("sentences")
+def normalize_rows(vectors):
+    """벡터들을 (n, dim) float32 행렬로 만들어 행마다 L2 정규화 (Python 루프 없이 한 번에)"""
+    m = np.asarray(vectors, dtype=np.float32)
+    return m / (np.linalg.norm(m, axis=1, keepdims=True) + 1e-12)
 
 def create_data(file_path, start_idx, end_idx, embedding):
     doc_id = f"{file_path}_{start_idx}_{end_idx}"
-    collection.add(
+    get_collection().add(
         ids=[doc_id],
-        embeddings=[embedding],
+        embeddings=[normalize(embedding)],
         metadatas=[{"file_path": file_path, "start_idx": start_idx, "end_idx": end_idx}]
     )
 
+def create_data_batch(file_path, start_idxs, end_idxs, embeddings):
+    """한 파일의 여러 chunk를 collection.add 한 번으로 저장 (chunk마다 왕복하지 않음)"""
+    if not embeddings:
+        return
+    get_collection().add(
+        ids=[f"{file_path}_{start}_{end}" for start, end in zip(start_idxs, end_idxs)],
+        embeddings=normalize_rows(embeddings),
+        metadatas=[{"file_path": file_path, "start_idx": start, "end_idx": end}
+                   for start, end in zip(start_idxs, end_idxs)]
+    )
+
 def delete_data(file_path):
-    collection.delete(where={"file_path": file_path})
+    get_collection().delete(where={"file_path": file_path})
 
-def search_data(query_embedding, n_results=10, pathlist=None):
-    if pathlist:
+def search_data_batch(query_embeddings, n_results=10, pathlist=None):
+    """
+    여러 query embedding을 한 번의 collection.query 호출로 검색
+    query별로 (file_path, start_idx, end_idx, distance) 리스트를 반환
+    """
+    # query_embeddings는 호출 측에서 이미 정규화된 벡터여야 한다
+    if pathlist and query_embeddings:
         # pathlist가 있으면 해당 파일들만 검색
-        results = collection.query(
-            query_embeddings=[query_embedding],
+        results = get_collection().query(
+            query_embeddings=query_embeddings,
             n_results=n_results,
-            where={"file_path": {"$in": pathlist}}
+            where={"file_path": {"$in": pathlist}},
+            # 메타데이터와 거리만 사용하므로 documents/embeddings는 받지 않음
+            include=["metadatas", "distances"]
         )
-        return [(meta["file_path"], meta["start_idx"], meta["end_idx"]) 
-                for meta in results["metadatas"][0]]
+        return [[(meta["file_path"], meta["start_idx"], meta["end_idx"], distance)
+                 for meta, distance in zip(metas, distances)]
+                for metas, distances in zip(results["metadatas"], results["distances"])]
     else:
         # pathlist가 없으면 권한이 없으므로 빈 리스트 반환
-        return []
\ No newline at end of file
+        return [[] for _ in query_embeddings]
+
+def search_data(query_embedding, n_results=10, pathlist=None):
+    return search_data_batch([query_embedding], n_results=n_results, pathlist=pathlist)[0]
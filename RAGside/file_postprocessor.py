@@ -1,52 +1,257 @@
+import os
 import zmq
 import time
+import msgpack
+import msgspec
+import hashlib
+import functools
+import logging
+import queue
+import threading
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from Models.embedding import Embedding
-from Models.llm import LLM, LLM_small
-from db import create_data, delete_data
+from Models.llm import LLM_small
+from db import create_data_batch, delete_data
+from logging_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+# JSON 인코딩/디코딩은 msgspec 사용 (표준 json보다 빠르고 str을 거치지 않고 바로 bytes로 인코딩됨)
+_dumps = msgspec.json.Encoder().encode
+_loads = msgspec.json.decode
+
+
+def _file_name(file_path):
+    """Windows(\\)/POSIX(/) 구분자가 섞인 경로에서도 파일 이름만 반환"""
+    return os.path.basename(file_path.replace('\\', '/'))
+
+
+# 마지막 문장 위치 찾기: pyahocorasick이 있으면 모든 문장을 content 한 번 훑어서 찾고, 없으면 문장마다 str.find
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# str.split()이 공백으로 보는 모든 문자의 code point
+_WHITESPACE_CODEPOINTS = np.array([c for c in range(0x3000 + 1) if chr(c).isspace()], dtype=np.uint32)
+
+
+def _word_count_table(content):
+    """
+    table[i] == len(content[:i].split())인 누적 단어 수 배열 (길이 len(content) + 1)
+    단어의 시작(공백이 아닌 문자 중 바로 앞이 공백이거나 맨 앞인 문자)을 numpy로 한 번에 세어 누적
+    """
+    codepoints = np.frombuffer(content.encode('utf-32-le'), dtype=np.uint32)
+    is_space = np.isin(codepoints, _WHITESPACE_CODEPOINTS)
+    word_start = ~is_space
+    word_start[1:] &= is_space[:-1]
+    table = np.zeros(len(codepoints) + 1, dtype=np.int64)
+    np.cumsum(word_start, out=table[1:])
+    return table
+
+
+def _sentence_finder(content, end_sentences):
+    """find(문장, 시작 위치) -> 시작 위치 이후 content에서 문장이 처음 나오는 위치 (없으면 -1) 함수를 반환"""
+    if ahocorasick is None or len(end_sentences) < 2:
+        return content.find
+    
+    automaton = ahocorasick.Automaton()
+    for sentence in end_sentences:
+        automaton.add_word(sentence, sentence)
+    automaton.make_automaton()
+    
+    # 문장별 등장 위치 (끝 위치 순으로 나오므로 문장별로는 정렬되어 있음)
+    starts = {}
+    for end_idx, sentence in automaton.iter(content):
+        starts.setdefault(sentence, []).append(end_idx - len(sentence) + 1)
+    
+    def find(sentence, start):
+        positions = starts.get(sentence)
+        if positions:
+            i = bisect_left(positions, start)
+            if i < len(positions):
+                return positions[i]
+        return -1
+    return find
+
+
+class _SemanticCache:
+    """
+    임베딩이 거의 같은(코사인 유사도 threshold 이상) 텍스트의 결과를 재사용하는 메모리 캐시
+    정규화한 벡터를 (capacity, dim) 행렬에 순환 버퍼로 저장하고, 조회는 행렬-벡터 곱 한 번
+    """
+    def __init__(self, capacity=10000, threshold=0.97):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._vectors = None  # 첫 저장 때 차원을 알고 할당
+        self._values = [None] * capacity
+        self._size = 0
+        self._next = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        return v / (np.linalg.norm(v) + 1e-12)
+    
+    def get(self, vector):
+        """가장 비슷한 항목의 유사도가 threshold 이상이면 그 값을, 아니면 None"""
+        with self._lock:
+            if not self._size:
+                return None
+            sims = self._vectors[:self._size] @ self._normalize(vector)
+            best = int(np.argmax(sims))
+            return self._values[best] if sims[best] >= self.threshold else None
+    
+    def put(self, vector, value):
+        """가득 차면 가장 오래된 항목을 덮어씀"""
+        v = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None:
+                self._vectors = np.empty((self.capacity, v.shape[0]), dtype=np.float32)
+            self._vectors[self._next] = v
+            self._values[self._next] = value
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+
+
+def _timed(stage):
+    """메서드 실행 시간을 stage 이름으로 self._record_timing에 누적하는 decorator"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self._record_timing(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
 
 #클라이언트는 요약하는 애는 전부다 sllm으로 수정 필요
 class FilePostprocessor:
-    def __init__(self, pull_port=5558, messagedb_port=5560):
-        self.context = zmq.Context()
+    def __init__(self, pull_port=5558, messagedb_port=5560, llm_workers=8,
+                 embedding_cache_size=20000, llm_cache_size=10000,
+                 summary_cache_size=10000, summary_cache_threshold=0.97,
+                 message_workers=4, message_queue_size=64,
+                 embedding_fn=Embedding, llm_fn=LLM_small, chunker=None, rcvhwm=64,
+                 metrics_interval=60.0):
+        # 모델 호출과 청킹 방식은 주입 가능 (기본값은 Models의 HTTP 클라이언트와 LLM 기반 청킹)
+        # embedding_fn(texts) -> 벡터 리스트, llm_fn(prompt) -> 응답 문자열,
+        # chunker(content, file_path) -> (chunks, offsets)
+        self._embedding_fn = embedding_fn
+        self._llm_fn = llm_fn
+        self._chunker = chunker or self._chunk_content
+        
+        # 컨텍스트는 프로세스 전역 싱글톤을 공유 (postprocessor마다 IO 스레드를 만들지 않음)
+        self.context = zmq.Context.instance()
         self.pull_socket = self.context.socket(zmq.PULL)
+        # 메시지 하나에 파일 전체 텍스트가 들어 있으므로 수신 대기열을 rcvhwm개로 제한해 메모리를 묶어둠
+        # (넘치면 preprocessor의 PUSH가 대기), LINGER 0으로 종료시 term()이 멈추지 않게 함
+        self.pull_socket.setsockopt(zmq.RCVHWM, rcvhwm)
+        self.pull_socket.setsockopt(zmq.LINGER, 0)
         self.pull_socket.connect(f"tcp://localhost:{pull_port}")
         
         # messagedb와 통신을 위한 REQ 소켓
         self.req_socket = self.context.socket(zmq.REQ)
+        self.req_socket.setsockopt(zmq.LINGER, 0)
         self.req_socket.connect(f"tcp://localhost:{messagedb_port}")
+        # REQ 소켓은 스레드 안전하지 않고 send/recv 순서를 지켜야 하므로 여러 worker의 사용을 직렬화
+        self._req_lock = threading.Lock()
         
         self.running = False
         
-        # 현재 처리중인 파일의 요약 정보를 저장
-        self.current_summary = None
+        # 현재 처리중인 파일의 요약 정보 (메시지는 worker 스레드에서 처리되므로 스레드별로 저장)
+        self._local = threading.local()
+        
+        # 메시지 처리 큐 (수신 루프는 큐에 넣기만 하고, worker 스레드들이 처리)
+        # 한 파일의 LLM/임베딩 호출을 기다리는 동안 다른 파일의 메시지를 처리할 수 있음
+        # 같은 파일의 메시지는 항상 같은 큐로 가므로 파일별 처리 순서(delete_data -> create_data)가 유지됨
+        # 큐가 가득 차면 수신 루프가 대기하므로 쌓이는 메시지는 ZeroMQ 수신 대기열에 남음
+        self._message_queues = [queue.Queue(maxsize=message_queue_size) for _ in range(max(1, message_workers))]
+        self._message_threads = []
+        
+        # 청크별 LLM 호출은 서로 독립적인 HTTP 요청이므로 스레드로 동시에 보냄
+        # (llm_workers는 LLM 서버가 동시에 처리할 수 있는 요청 수에 맞춤)
+        self._llm_pool = ThreadPoolExecutor(max_workers=llm_workers, thread_name_prefix="postprocessor-llm")
+        # 파일 요약(LLM)을 임베딩/업로드와 동시에 진행하는 스레드 (메시지 worker마다 하나씩)
+        # _summarize가 내부에서 _llm_pool을 사용하므로 _llm_pool과 분리해 서로 기다리며 멈추지 않게 함
+        self._summary_pool = ThreadPoolExecutor(max_workers=max(1, message_workers), thread_name_prefix="postprocessor-summary")
+        
+        # 텍스트 해시 -> 결과 LRU 캐시
+        # 파일을 조금 수정하면 대부분의 청크는 그대로이므로 같은 청크의 임베딩/요약은 다시 요청하지 않음
+        # (임베딩은 메모리를 줄이기 위해 float32 배열로 보관)
+        self._embedding_cache = OrderedDict()
+        self._embedding_cache_size = embedding_cache_size
+        self._llm_cache = OrderedDict()
+        self._llm_cache_size = llm_cache_size
+        self._cache_lock = threading.Lock()
+        # 단계별 처리 시간 (stage -> [누적 초, 횟수]), metrics_interval초마다 로그로 내보내고 초기화
+        # 어느 단계(청킹 LLM, 임베딩, 업로드, 요약)가 시간을 쓰는지 보고 최적화 우선순위를 정하기 위함
+        self.metrics_interval = metrics_interval
+        self._timings = {}
+        self._timings_since = time.monotonic()
+        self._timings_lock = threading.Lock()
+        
+        # 청크 임베딩 -> 청크 요약 캐시 (조금 수정된 청크는 텍스트 해시가 달라도 이전 요약을 재사용)
+        self._summary_cache = _SemanticCache(summary_cache_size, summary_cache_threshold)
+
+    @property
+    def current_summary(self):
+        return getattr(self._local, 'summary', None)
+    
+    @current_summary.setter
+    def current_summary(self, summary):
+        self._local.summary = summary
+
+    def _record_timing(self, stage, seconds):
+        with self._timings_lock:
+            timing = self._timings.setdefault(stage, [0.0, 0])
+            timing[0] += seconds
+            timing[1] += 1
+    
+    def _report_timings(self, force=False):
+        """metrics_interval이 지났으면 단계별 누적 시간을 로그로 남기고 초기화"""
+        now = time.monotonic()
+        with self._timings_lock:
+            if not self._timings or (not force and now - self._timings_since < self.metrics_interval):
+                return
+            timings, self._timings = self._timings, {}
+            elapsed, self._timings_since = now - self._timings_since, now
+        logger.info("⏱️ 최근 %.0f초 단계별 처리 시간: %s", elapsed, ", ".join(
+            f"{stage} {total * 1000:.0f}ms/{count}회 (평균 {total * 1000 / count:.0f}ms)"
+            for stage, (total, count) in sorted(timings.items(), key=lambda item: -item[1][0])))
 
     def handle_create(self, message):
         """파일 생성 처리"""
         file_path = message.get('file_path')
         content = message.get('content')
-        print(f"🔨 [CREATE] 파일 생성 처리 시작: {file_path}")
+        logger.info("🔨 [CREATE] 파일 생성 처리 시작: %s", file_path)
 
         if content:
-            print(f"   📝 텍스트 청킹 시작...")
-            chunks, offsets = self._chunk_content(content, file_path)
-            print(f"   ✅ 청킹 완료: {len(chunks)}개 청크 생성")
+            chunks, offsets = self._chunker(content, file_path)
+            logger.debug("✅ 청킹 완료: %d개 청크 생성", len(chunks))
             
-            print(f"   🔍 임베딩 생성 시작...")
             embeddings = self._process_content(chunks, file_path, offsets)
-            print(f"   ✅ 임베딩 생성 완료: {len(embeddings)}개 벡터")
+            logger.debug("✅ 임베딩 생성 완료: %d개 벡터", len(embeddings))
+            
+            # 요약(LLM 서버)과 업로드(ChromaDB)는 서로 다른 자원을 쓰므로 동시에 진행
+            # 요약은 청크 임베딩으로 비슷한 청크의 이전 요약을 찾으므로 임베딩 이후에 시작
+            summary_future = self._summary_pool.submit(
+                self._summarize, chunks, file_path, [embedding_data['embedding'] for embedding_data in embeddings])
             
-            print(f"   💾 ChromaDB 업로드 시작...")
             self._upload_embeddings(embeddings, file_path)
-            print(f"   ✅ ChromaDB 업로드 완료")
             
-            print(f"   📊 요약 생성 시작...")
-            self._summarize(chunks, file_path)
-            print(f"   ✅ 요약 생성 완료")
+            # 요약은 이 메시지를 처리하는 스레드의 current_summary에 저장
+            self.current_summary = summary_future.result()
         else:
-            print(f"   ⚠️ 파일 내용이 없습니다.")
+            logger.warning("⚠️ 파일 내용이 없습니다: %s", file_path)
             
-        print(f"🎉 [CREATE] 파일 생성 처리 완료: {file_path}")
-        print("   " + "=" * 50)
+        logger.info("🎉 [CREATE] 파일 생성 처리 완료: %s", file_path)
 
     def handle_update(self, message):
         """파일 수정 처리"""
@@ -54,86 +259,79 @@ class FilePostprocessor:
         content = message.get('content')
         diff_content = message.get('diff_content')
         
-        print(f"🔄 [UPDATE] 파일 수정 처리 시작: {file_path}")
+        logger.info("🔄 [UPDATE] 파일 수정 처리 시작: %s", file_path)
         
         # diff_content가 없거나 의미있는 변경사항이 없으면 처리 건너뛰기
         if not diff_content or not diff_content.strip():
-            print(f"   ⚠️ 실제 변경사항이 없어 UPDATE 처리를 건너뜁니다.")
-            print(f"   📄 파일 접근만 발생한 것으로 판단됩니다.")
-            # summary를 None으로 설정하여 알림이 전송되지 않도록 함
+            # 파일 접근만 발생한 경우. summary를 None으로 설정하여 알림이 전송되지 않도록 함
             self.current_summary = None
-            print(f"🎉 [UPDATE] 파일 수정 처리 완료 (처리 생략): {file_path}")
-            print("   " + "=" * 50)
+            logger.info("⏭️ [UPDATE] 실제 변경사항이 없어 처리 생략: %s", file_path)
             return
         
-        print(f"   🗑️ 기존 데이터 삭제 중...")
-        delete_data(file_path)
-        print(f"   ✅ 기존 데이터 삭제 완료")
+        # 변경사항 요약은 기존 데이터 삭제/청킹/임베딩과 동시에 진행
+        summary_future = self._llm_pool.submit(self._summarize_diff, file_path, diff_content)
         
-        print(f"   📊 변경사항 요약 생성 중...")
-        try:
-            summary = LLM_small(f"다음 변경사항을 1~2문장으로 요약해주세요: {diff_content}")
-            # 변경사항 요약을 인스턴스 변수에 저장
-            self.current_summary = summary if summary and summary.strip() else "파일이 수정되었습니다."
-            file_name = file_path.split('\\')[-1] if '\\' in file_path else file_path.split('/')[-1]
-            print(f"   📋 {file_name} 파일이 수정되었습니다.")
-            print(f"   📍 경로: {file_path}")
-            print(f"   📝 변경사항: {self.current_summary}")
-        except Exception as e:
-            print(f"   ❌ 변경사항 요약 생성 실패: {e}")
-            file_name = file_path.split('\\')[-1] if '\\' in file_path else file_path.split('/')[-1]
-            self.current_summary = f"{file_name} 파일이 수정되었습니다."
+        delete_data(file_path)
+        logger.debug("✅ 기존 데이터 삭제 완료: %s", file_path)
         
         if content:
-            print(f"   📝 텍스트 청킹 시작...")
-            chunks, offsets = self._chunk_content(content, file_path)
-            print(f"   ✅ 청킹 완료: {len(chunks)}개 청크 생성")
+            chunks, offsets = self._chunker(content, file_path)
+            logger.debug("✅ 청킹 완료: %d개 청크 생성", len(chunks))
             
-            print(f"   🔍 임베딩 생성 시작...")
             embeddings = self._process_content(chunks, file_path, offsets)
-            print(f"   ✅ 임베딩 생성 완료: {len(embeddings)}개 벡터")
+            logger.debug("✅ 임베딩 생성 완료: %d개 벡터", len(embeddings))
             
-            print(f"   💾 ChromaDB 업로드 시작...")
             self._upload_embeddings(embeddings, file_path)
-            print(f"   ✅ ChromaDB 업로드 완료")
         else:
-            print(f"   ⚠️ 파일 내용이 없습니다.")
+            logger.warning("⚠️ 파일 내용이 없습니다: %s", file_path)
+        
+        # 변경사항 요약을 인스턴스 변수에 저장
+        self.current_summary = summary_future.result()
             
-        print(f"🎉 [UPDATE] 파일 수정 처리 완료: {file_path}")
-        print("   " + "=" * 50)
+        logger.info("🎉 [UPDATE] 파일 수정 처리 완료: %s", file_path)
+    
+    @_timed('summary')
+    def _summarize_diff(self, file_path, diff_content):
+        """변경사항(diff)을 LLM으로 요약 (실패하면 기본 문구)"""
+        try:
+            summary = self._llm_fn(f"다음 변경사항을 1~2문장으로 요약해주세요: {diff_content}")
+            summary = summary if summary and summary.strip() else "파일이 수정되었습니다."
+            logger.info("📝 %s 변경사항: %s", file_path, summary)
+            return summary
+        except Exception as e:
+            logger.error("❌ 변경사항 요약 생성 실패: %s", e)
+            return f"{_file_name(file_path)} 파일이 수정되었습니다."
 
+    @_timed('delete')
     def handle_delete(self, message):
         """파일 삭제 처리"""
         file_path = message.get('file_path')
-        print(f"🗑️ [DELETE] 파일 삭제 처리 시작: {file_path}")
-        
-        print(f"   💾 ChromaDB에서 데이터 삭제 중...")
         delete_data(file_path)
-        print(f"   ✅ ChromaDB 데이터 삭제 완료")
-        
-        file_name = file_path.split('\\')[-1] if '\\' in file_path else file_path.split('/')[-1]
-        print(f"   📋 {file_name} 파일이 삭제되었습니다.")
-        print(f"   📍 경로: {file_path}")
-        
-        print(f"🎉 [DELETE] 파일 삭제 처리 완료: {file_path}")
-        print("   " + "=" * 50)
+        logger.info("🗑️ [DELETE] ChromaDB 데이터 삭제 완료: %s", file_path)
 
+    @_timed('chunk')
     def _chunk_content(self, content, file_path):
         """텍스트 청킹"""
         if not content or not content.strip():
             return [], []
         
-        # 1. content를 overlap과 함께 작은 chunk들로 나누기
-        pre_chunks = self._split_with_overlap(content, 1000, 200)
+        # 1. content를 overlap과 함께 작은 chunk들로 나누기 (LLM에 넘길 때 필요한 구간만 잘라냄)
+        pre_chunks = (content[start:end] for start, end in self._split_with_overlap(len(content), 1000, 200))
         
         # 2. 각 pre_chunk에서 LLM으로 의미적 끝점의 마지막 문장들 추출
+        # pre_chunk마다 독립적인 호출이므로 동시에 요청하고, 결과는 pre_chunk 순서대로 합침
+        # (_extract_end_sentences가 실패를 빈 리스트로 처리하므로 한 호출의 실패가 전체를 멈추지 않음)
+        end_sentence_results = self._llm_pool.map(self._extract_end_sentences, pre_chunks)
+        
+        # LLM 응답을 기다리는 동안 위치별 누적 단어 수를 미리 계산 (파일당 한 번)
+        word_count_at = _word_count_table(content)
+        
         all_end_sentences = []
-        for pre_chunk in pre_chunks:
-            end_sentences = self._extract_end_sentences(pre_chunk)
+        for end_sentences in end_sentence_results:
             all_end_sentences.extend(end_sentences)
         
         # 3. 마지막 문장들의 위치를 찾아서 content를 최종 분할
-        final_chunks = self._split_by_end_sentences(content, all_end_sentences)
+        final_chunks = self._split_by_end_sentences(content, all_end_sentences, word_count_at)
         
         chunks = [chunk["text"] for chunk in final_chunks]
         offsets = [{
@@ -146,22 +344,51 @@ class FilePostprocessor:
         
         return chunks, offsets
 
-    def _split_with_overlap(self, content, chunk_size, overlap):
-        """content를 지정된 크기로 overlap과 함께 분할"""
-        chunks = []
-        start = 0
+    def _split_with_overlap(self, length, chunk_size, overlap):
+        """길이 length인 content를 chunk_size 크기로 overlap만큼 겹치게 나눈 (start, end) 구간들을 생성"""
+        if chunk_size <= overlap:
+            # 다음 구간의 시작이 앞으로 가지 않아 끝나지 않음
+            raise ValueError(f"chunk_size({chunk_size})는 overlap({overlap})보다 커야 합니다")
         
-        while start < len(content):
-            end = min(start + chunk_size, len(content))
-            chunk = content[start:end]
-            chunks.append(chunk)
+        start = 0
+        while start < length:
+            end = min(start + chunk_size, length)
+            yield start, end
             
-            if end >= len(content):
+            if end >= length:
                 break
                 
             start = end - overlap
-        
-        return chunks
+
+    @staticmethod
+    def _text_key(text):
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    
+    def _cache_get(self, cache, key):
+        """LRU 캐시 조회 (없으면 None)"""
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+    
+    def _cache_put(self, cache, max_size, key, value):
+        """LRU 캐시에 저장하고 max_size를 넘으면 가장 오래된 항목 제거"""
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > max_size:
+                cache.popitem(last=False)
+    
+    def _llm_small_cached(self, prompt):
+        """같은 프롬프트의 LLM 결과를 재사용 (빈 응답은 캐시하지 않음)"""
+        key = self._text_key(prompt)
+        result = self._cache_get(self._llm_cache, key)
+        if result is None:
+            result = self._llm_fn(prompt)
+            if result:
+                self._cache_put(self._llm_cache, self._llm_cache_size, key, result)
+        return result
 
     def _extract_end_sentences(self, text):
         """LLM을 사용하여 텍스트에서 의미적으로 끝나는 지점의 마지막 문장들을 추출"""
@@ -174,26 +401,35 @@ class FilePostprocessor:
 마지막 문장들:"""
         
         try:
-            response = LLM_small(prompt)
+            response = self._llm_small_cached(prompt)
             sentences = [line.strip() for line in response.split('\n') if line.strip()]
             return sentences
         except Exception as e:
-            print(f"LLM 호출 실패: {e}")
+            logger.error("❌ LLM 호출 실패: %s", e)
             return []
 
-    def _split_by_end_sentences(self, content, end_sentences):
-        """마지막 문장들의 위치를 기준으로 content를 최종 분할"""
+    def _split_by_end_sentences(self, content, end_sentences, word_count_at=None):
+        """
+        마지막 문장들의 위치를 기준으로 content를 최종 분할
+        word_count_at: _word_count_table(content) 결과 (없으면 여기서 계산)
+        """
+        # 위치별 누적 단어 수는 한 번만 계산 (청크마다 앞부분 전체를 다시 split하지 않음)
+        if word_count_at is None:
+            word_count_at = _word_count_table(content)
+        total_words = int(word_count_at[-1])
+        
         if not end_sentences:
             # LLM 실패시 단순 분할
             return [{"chunk_index": 0, "text": content, "char_start": 0, "char_end": len(content), 
-                    "word_start": 0, "word_end": len(content.split()) - 1}]
+                    "word_start": 0, "word_end": total_words - 1}]
         
         chunks = []
         last_end = 0
         chunk_index = 0
+        find = _sentence_finder(content, end_sentences)
         
         for end_sentence in end_sentences:
-            end_pos = content.find(end_sentence, last_end)
+            end_pos = find(end_sentence, last_end)
             if end_pos == -1:
                 continue
                 
@@ -207,8 +443,8 @@ class FilePostprocessor:
                 "text": chunk_text,
                 "char_start": last_end,
                 "char_end": actual_end,
-                "word_start": len(content[:last_end].split()),
-                "word_end": len(content[:actual_end].split()) - 1
+                "word_start": int(word_count_at[last_end]),
+                "word_end": int(word_count_at[actual_end]) - 1
             }
             
             chunks.append(chunk)
@@ -224,17 +460,26 @@ class FilePostprocessor:
                     "text": remaining_text,
                     "char_start": last_end,
                     "char_end": len(content),
-                    "word_start": len(content[:last_end].split()),
-                    "word_end": len(content.split()) - 1
+                    "word_start": int(word_count_at[last_end]),
+                    "word_end": total_words - 1
                 }
                 chunks.append(chunk)
         
         return chunks
 
+    @_timed('embed')
     def _process_content(self, chunks, file_path, offsets):
         """임베딩 배치 생성"""
-        # 모든 chunks를 한 번에 배치 처리
-        embedding_vectors = Embedding(chunks)
+        # 캐시에 없는 chunk만 모아 한 번에 배치 처리하고, 결과는 원래 순서로 합침
+        keys = [self._text_key(chunk) for chunk in chunks]
+        embedding_vectors = [self._cache_get(self._embedding_cache, key) for key in keys]
+        misses = [i for i, vector in enumerate(embedding_vectors) if vector is None]
+        if misses:
+            for i, vector in zip(misses, self._embedding_fn([chunks[i] for i in misses])):
+                vector = np.asarray(vector, dtype=np.float32)
+                self._cache_put(self._embedding_cache, self._embedding_cache_size, keys[i], vector)
+                embedding_vectors[i] = vector
+        logger.debug("🗂️ 임베딩 캐시: %d/%d개 재사용", len(chunks) - len(misses), len(chunks))
         
         # 임베딩과 오프셋 정보를 매핑하여 반환
         embeddings = []
@@ -247,54 +492,49 @@ class FilePostprocessor:
         
         return embeddings
 
-    def _summarize(self, chunks, file_path):
-        """배치 청크 요약 후 최종 요약"""
-        print(f"       📊 개별 청크 요약 생성 중... ({len(chunks)}개 청크)")
-        
-        # 모든 chunks를 한 번에 배치 처리로 요약
-        prompts = [f"다음 텍스트를 1~2문장으로 요약해주세요: {chunk}" for chunk in chunks]
-        chunk_summaries = [LLM_small(prompt) for prompt in prompts]
-        
-        print(f"       ✅ 개별 청크 요약 완료")
-        print(f"       📝 최종 요약 생성 중...")
+    @_timed('summary')
+    def _summarize(self, chunks, file_path, vectors=None):
+        """
+        배치 청크 요약 후 최종 요약을 반환
+        vectors: 청크 임베딩 (있으면 임베딩이 비슷한 청크의 이전 요약을 재사용)
+        """
+        chunk_summaries = [None] * len(chunks)
+        if vectors is not None:
+            chunk_summaries = [self._summary_cache.get(vector) for vector in vectors]
+        misses = [i for i, summary in enumerate(chunk_summaries) if summary is None]
+        
+        # 청크 요약은 서로 독립적이므로 동시에 요청 (결과는 청크 순서대로)
+        prompts = [f"다음 텍스트를 1~2문장으로 요약해주세요: {chunks[i]}" for i in misses]
+        for i, summary in zip(misses, self._llm_pool.map(self._llm_small_cached, prompts)):
+            chunk_summaries[i] = summary
+            if vectors is not None and summary:
+                self._summary_cache.put(vectors[i], summary)
+        logger.debug("🗂️ 요약 캐시: %d/%d개 재사용", len(chunks) - len(misses), len(chunks))
         
         # 요약들을 종합하여 최종 요약
         combined_summaries = "\n".join(chunk_summaries)
-        final_summary = LLM_small(f"다음 요약들을 종합하여 최종 요약을 2~3문장으로 만들어주세요: {combined_summaries}")
-        
-        # 최종 요약을 인스턴스 변수에 저장
-        self.current_summary = final_summary
+        final_summary = self._llm_fn(f"다음 요약들을 종합하여 최종 요약을 2~3문장으로 만들어주세요: {combined_summaries}")
         
-        file_name = file_path.split('\\')[-1]
-        print(f"       📋 {file_name} 파일이 생성되었습니다.")
-        print(f"       📍 경로: {file_path}")
-        print(f"       📝 내용: {final_summary}")
-        print(f"       ✅ 최종 요약 완료")
+        logger.info("📝 %s 요약 (%d개 청크): %s", file_path, len(chunks), final_summary)
+        return final_summary
 
+    @_timed('upload')
     def _upload_embeddings(self, embeddings, file_path):
         """임베딩을 ChromaDB에 업로드"""
-        print(f"       💾 ChromaDB 업로드 진행 중... ({len(embeddings)}개 임베딩)")
-        
+        # 모든 청크를 collection.add 한 번으로 업로드
         success_count = 0
-        for i, embedding_data in enumerate(embeddings):
-            try:
-                create_data(
-                    file_path=file_path,
-                    start_idx=embedding_data['offset']['char_start'],
-                    end_idx=embedding_data['offset']['char_end'],
-                    embedding=embedding_data['embedding']
-                )
-                success_count += 1
-                
-                # 진행률 표시 (10% 단위)
-                progress = (i + 1) / len(embeddings) * 100
-                if (i + 1) % max(1, len(embeddings) // 10) == 0 or i == len(embeddings) - 1:
-                    print(f"       📈 업로드 진행률: {progress:.0f}% ({i + 1}/{len(embeddings)})")
-                    
-            except Exception as e:
-                print(f"       ❌ 임베딩 업로드 실패 (청크 {i}): {e}")
+        try:
+            create_data_batch(
+                file_path=file_path,
+                start_idxs=[embedding_data['offset']['char_start'] for embedding_data in embeddings],
+                end_idxs=[embedding_data['offset']['char_end'] for embedding_data in embeddings],
+                embeddings=[embedding_data['embedding'] for embedding_data in embeddings]
+            )
+            success_count = len(embeddings)
+        except Exception as e:
+            logger.error("❌ 임베딩 업로드 실패: %s", e)
         
-        print(f"       ✅ ChromaDB 업로드 완료: {success_count}/{len(embeddings)} 성공")
+        logger.debug("💾 ChromaDB 업로드 완료: %d/%d 성공", success_count, len(embeddings))
 
     def _send_to_messagedb(self, user_list, message_content, summary=None, timestamp=None):
         """messagedb에 메시지 전송"""
@@ -305,14 +545,13 @@ class FilePostprocessor:
                 "summary": summary,
                 "timestamp": timestamp or time.time()
             }
-            self.req_socket.send_json(message)
-            response = self.req_socket.recv_json()
-            print(f"   📤 messagedb 전송 완료: {len(user_list)}명에게 메시지 전송")
-            if summary:
-                print(f"   📝 요약 포함: {summary[:50]}...")
+            with self._req_lock:
+                self.req_socket.send(_dumps(message))
+                response = _loads(self.req_socket.recv())
+            logger.debug("📤 messagedb 전송 완료: %d명에게 메시지 전송 (요약 포함: %s)", len(user_list), bool(summary))
             return response
         except Exception as e:
-            print(f"   ❌ messagedb 전송 실패: {e}")
+            logger.error("❌ messagedb 전송 실패: %s", e)
             return None
 
     def process_message(self, message):
@@ -326,32 +565,26 @@ class FilePostprocessor:
         status = message.get('status')
         
         # 메시지 수신 로그 출력
-        print(f"📥 [RECEIVE <- file_preprocessor] 파일 처리 메시지 수신")
-        print(f"   📄 파일: {file_path}")
-        print(f"   📋 이벤트: {event_type}")
-        print(f"   👤 사용자: {user_id}")
-        print(f"   👥 좋아요 사용자: {liked_users}")
-        print(f"   ✅ 전처리 상태: {status}")
-        
-        if timestamp:
-            print(f"   📅 원본 타임스탬프: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}")
-        if processed_timestamp:
-            print(f"   📅 처리 타임스탬프: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(processed_timestamp))}")
-        
-        content = message.get('content')
-        if content:
-            content_length = message.get('content_length', len(content))
-            print(f"   📏 내용 길이: {content_length:,} 문자")
-        
-        if event_type == 'update':
-            diff_type = message.get('diff_type')
-            diff_content = message.get('diff_content')
-            if diff_type:
-                print(f"   📊 Diff 타입: {diff_type}")
-                if diff_content:
-                    print(f"   📊 Diff 크기: {len(diff_content)} chars")
-        
-        print("   " + "-" * 50)
+        logger.info("📥 [RECEIVE <- file_preprocessor] %s %s", event_type, file_path)
+        
+        # 상세한 수신 정보는 DEBUG 레벨에서만 문자열을 만듦
+        if logger.isEnabledFor(logging.DEBUG):
+            lines = [
+                f"   👤 사용자: {user_id}",
+                f"   👥 좋아요 사용자: {liked_users}",
+                f"   ✅ 전처리 상태: {status}",
+            ]
+            if timestamp:
+                lines.append(f"   📅 원본 타임스탬프: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}")
+            if processed_timestamp:
+                lines.append(f"   📅 처리 타임스탬프: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(processed_timestamp))}")
+            content = message.get('content')
+            if content:
+                lines.append(f"   📏 내용 길이: {message.get('content_length', len(content)):,} 문자")
+            if event_type == 'update' and message.get('diff_type'):
+                diff_content = message.get('diff_content')
+                lines.append(f"   📊 Diff: {message.get('diff_type')} ({len(diff_content) if diff_content else 0} chars)")
+            logger.debug("\n".join(lines))
         
         # 실제 처리 로직 실행
         if event_type == 'create':
@@ -366,7 +599,7 @@ class FilePostprocessor:
             # DELETE의 경우 요약이 없으므로 현재 요약을 초기화
             self.current_summary = None
         else:
-            print(f"❌ 알 수 없는 이벤트 타입: {event_type}")
+            logger.error("❌ 알 수 없는 이벤트 타입: %s", event_type)
             return
         
         # 처리 완료 후 좋아요 사용자들에게 알림 전송 (요약과 timestamp 포함)
@@ -377,31 +610,76 @@ class FilePostprocessor:
                 summary=self.current_summary,
                 timestamp=timestamp
             )
-            print(f"📬 알림 전송 완료: {len(liked_users)}명에게 전송")
+            logger.info("📬 알림 전송 완료: %d명에게 전송", len(liked_users))
         elif liked_users and self.current_summary is None:
-            print(f"📬 알림 전송 생략: 실제 변경사항이 없어 알림하지 않음")
+            logger.debug("📬 알림 전송 생략: 실제 변경사항이 없어 알림하지 않음")
         
         # 전송 후 요약 초기화
         self.current_summary = None
 
+    def _message_worker(self, message_queue):
+        """큐에서 메시지를 꺼내 처리 (None을 받으면 종료)"""
+        while True:
+            message = message_queue.get()
+            if message is None:
+                break
+            try:
+                self.process_message(message)
+            except Exception as e:
+                logger.error("❌ 메시지 처리 중 오류: %s", e)
+            self._report_timings()
+    
+    def start_message_workers(self):
+        """메시지 처리 스레드 시작"""
+        self._message_threads = [
+            threading.Thread(target=self._message_worker, args=(message_queue,), daemon=True)
+            for message_queue in self._message_queues
+        ]
+        for message_thread in self._message_threads:
+            message_thread.start()
+    
+    def stop_message_workers(self):
+        """큐에 남은 메시지를 모두 처리한 뒤 메시지 처리 스레드 종료"""
+        for message_queue in self._message_queues:
+            message_queue.put(None)
+        for message_thread in self._message_threads:
+            message_thread.join()
+
     def start(self):
         """서비스 시작"""
         self.running = True
-        print("File Postprocessor 시작...")
+        logger.info("🚀 File Postprocessor 시작")
+        self.start_message_workers()
 
         try:
             while self.running:
                 if self.pull_socket.poll(timeout=1000):
-                    message = self.pull_socket.recv_json()
-                    self.process_message(message)
+                    # [msgpack 헤더, 추출 텍스트] 두 프레임: 수신 버퍼를 bytes로 복사하지 않고 그대로 디코딩
+                    frames = self.pull_socket.recv_multipart(copy=False)
+                    message = msgpack.unpackb(frames[0].buffer, raw=False)
+                    if len(frames) > 1 and len(frames[1].buffer):
+                        message['content'] = str(frames[1].buffer, 'utf-8')
+                    else:
+                        message.setdefault('content', None)
+                    file_path = message.get('file_path') or ''
+                    self._message_queues[hash(file_path) % len(self._message_queues)].put(message)
 
         except KeyboardInterrupt:
-            print("종료 중...")
+            logger.info("🛑 종료 중...")
         finally:
+            self.stop_message_workers()
+            self._report_timings(force=True)
+            self._summary_pool.shutdown(wait=False)
+            self._llm_pool.shutdown(wait=False)
             self.pull_socket.close()
             self.req_socket.close()
             self.context.term()
 
 if __name__ == "__main__":
-    postprocessor = FilePostprocessor()
-    postprocessor.start()
\ No newline at end of file
+    log_listener = setup_logging(logging.INFO)
+    try:
+        postprocessor = FilePostprocessor()
+        postprocessor.start()
+    finally:
+        # 큐에 남은 로그를 모두 출력하고 listener 스레드 종료
+        log_listener.stop()
\ No newline at end of file
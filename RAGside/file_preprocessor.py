@@ -5,31 +5,57 @@
 - 처리된 파일 정보를 다음 노드로 전송
 """
 
+import io
 import os
 import time
-import json
-import base64
-import threading
+import hashlib
+import logging
 import struct
 import zlib
 import re
 import unicodedata
-from pathlib import Path
-from typing import Dict, Any, Optional, Union
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Union, BinaryIO
 
 import zmq
+import msgpack
+import msgspec
 from docx import Document
 import pdfplumber
 import olefile
 
+from logging_setup import setup_logging
 
-def read_file(file_path: str) -> str:
+logger = logging.getLogger(__name__)
+
+# 이전 형식(base64 문자열)의 파일 내용 디코딩: pybase64가 있으면 사용 (SIMD로 훨씬 빠름), 없으면 표준 base64
+try:
+    from pybase64 import b64decode as _b64decode
+except ImportError:
+    from base64 import b64decode as _b64decode
+
+# 중복 이벤트 감지용 파일 내용 해시 (프로세스 안에서 내용 비교에만 쓰므로 암호학적 해시일 필요 없음)
+# xxhash가 있으면 xxh3_128 사용 (SIMD로 훨씬 빠름), 없으면 blake2b
+try:
+    from xxhash import xxh3_128_digest as _content_digest
+except ImportError:
+    def _content_digest(data):
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+# file_watcher의 JSON 헤더는 msgspec으로 디코딩 (bytes 프레임을 str로 바꾸지 않고 바로 파싱)
+_loads = msgspec.json.decode
+
+
+def read_file(file_path: Union[str, os.PathLike],
+              data: Union[bytes, bytearray, memoryview, BinaryIO, None] = None) -> str:
     """
     주어진 경로의 파일(.txt, .docx, .pdf, .hwp)을 읽어 텍스트 내용을 문자열로 반환합니다.
     한국어 파일에 최적화되어 있습니다.
 
     Args:
-        file_path (str): 읽을 파일의 경로
+        file_path (str | PathLike): 읽을 파일의 경로 (data가 있으면 확장자 판단에만 사용)
+        data: 이미 메모리에 있는 파일 내용 (bytes류 또는 BytesIO 같은 file-like 객체)
+              있으면 디스크에서 읽지 않음
 
     Returns:
         str: 파일에서 추출한 텍스트 내용
@@ -38,37 +64,54 @@ def read_file(file_path: str) -> str:
         FileNotFoundError: 파일이 존재하지 않을 경우 발생합니다.
         ValueError: 지원하지 않는 파일 형식일 경우 발생합니다.
     """
-    if not os.path.exists(file_path):
+    file_path = os.fspath(file_path)
+    if data is None and not os.path.exists(file_path):
         raise FileNotFoundError(f"오류: '{file_path}' 파일을 찾을 수 없습니다.")
 
     # 파일 확장자를 소문자로 추출
     _, extension = os.path.splitext(file_path)
     extension = extension.lower()
 
+    # docx/pdf/hwp 파서에 넘길 대상: 경로, file-like 객체는 그대로, bytes류는 BytesIO로 감쌈
+    if data is None:
+        source = file_path
+    elif hasattr(data, 'read'):
+        source = data
+    else:
+        source = io.BytesIO(data)
+
     full_text = ""
 
     try:
         if extension == '.txt':
             # UTF-8으로 먼저 시도하고, 오류 발생 시 CP949로 재시도 (Windows 환경 호환)
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    full_text = f.read()
-            except UnicodeDecodeError:
-                with open(file_path, 'r', encoding='cp949') as f:
-                    full_text = f.read()
+            if data is not None:
+                raw = data.read() if hasattr(data, 'read') else data
+                try:
+                    full_text = str(raw, 'utf-8')
+                except UnicodeDecodeError:
+                    full_text = str(raw, 'cp949')
+            else:
+                try:
+                    with open(file_path, 'r', encoding='utf-8') as f:
+                        full_text = f.read()
+                except UnicodeDecodeError:
+                    with open(file_path, 'r', encoding='cp949') as f:
+                        full_text = f.read()
 
         elif extension == '.docx':
-            doc = Document(file_path)
+            doc = Document(source)
             text_list = [para.text for para in doc.paragraphs]
             full_text = '\n'.join(text_list)
 
         elif extension == '.pdf':
-            with pdfplumber.open(file_path) as pdf:
-                text_list = [page.extract_text() for page in pdf.pages if page.extract_text()]
-                full_text = '\n'.join(text_list)
+            with pdfplumber.open(source) as pdf:
+                # 페이지마다 extract_text()를 한 번만 호출하고 페이지 텍스트를 바로 이어 붙임
+                page_texts = (page.extract_text() for page in pdf.pages)
+                full_text = '\n'.join(text for text in page_texts if text)
 
         elif extension == '.hwp':
-            full_text = _extract_hwp_file(file_path)
+            full_text = _extract_hwp_file(source)
 
         else:
             raise ValueError(
@@ -78,13 +121,13 @@ def read_file(file_path: str) -> str:
             
     except Exception as e:
         # 파일 처리 중 발생할 수 있는 모든 예외를 처리합니다.
-        print(f"'{file_path}' 파일 처리 중 오류 발생: {e}")
+        logger.error("'%s' 파일 처리 중 오류 발생: %s", file_path, e)
         return "" # 오류 발생 시 빈 문자열 반환
 
     return full_text
 
 
-def _extract_hwp_file(file_path: str) -> str:
+def _extract_hwp_file(file_path) -> str:
     """Main HWP extraction logic."""
 
     # HWP file constants
@@ -118,13 +161,11 @@ def _extract_hwp_file(file_path: str) -> str:
 
     sections = [f"BodyText/Section{num}" for num in sorted(section_numbers)]
 
-    # Extract text from all sections
-    extracted_text = ""
-    for section in sections:
-        extracted_text += _extract_hwp_section_text(
-            ole_file, section, is_compressed, HWP_TEXT_TAGS
-        )
-        extracted_text += "\n"
+    # Extract text from all sections (joined once instead of growing a string per section)
+    extracted_text = "".join(
+        _extract_hwp_section_text(ole_file, section, is_compressed, HWP_TEXT_TAGS) + "\n"
+        for section in sections
+    )
 
     ole_file.close()
     return extracted_text.strip()
@@ -148,7 +189,7 @@ def _extract_hwp_section_text(
     # Parse section data to extract text content
     size = len(unpacked_data)
     position = 0
-    text_content = ""
+    text_parts = []
 
     while position < size:
         try:
@@ -160,7 +201,7 @@ def _extract_hwp_section_text(
                 record_data = unpacked_data[position + 4 : position + 4 + record_length]
                 decoded_text = _decode_hwp_record_data(record_data)
                 if decoded_text:
-                    text_content += decoded_text + "\n"
+                    text_parts.append(decoded_text)
 
             position += 4 + record_length
 
@@ -169,7 +210,7 @@ def _extract_hwp_section_text(
             position += 1
             continue
 
-    return text_content
+    return "".join(text + "\n" for text in text_parts)
 
 
 def _decode_hwp_record_data(record_data: bytes) -> str:
@@ -192,15 +233,34 @@ def _decode_hwp_record_data(record_data: bytes) -> str:
         return ""
 
 
+# file_watcher(oracle.py)와 같은 호스트에서 실행되므로 POSIX에서는 ipc로 연결 (oracle.py의 endpoint와 동일해야 함)
+# Windows는 ipc를 지원하지 않으므로 TCP 사용
+IPC_AVAILABLE = os.name != 'nt'
+WATCHER_PUSH_IPC_ENDPOINT = "ipc:///tmp/db_sorcerer_push.sock"
+WATCHER_ROUTER_IPC_ENDPOINT = "ipc:///tmp/db_sorcerer_router.sock"
+# file_watcher ROUTER 파일 요청 프로토콜 버전 (oracle.py의 FILE_PROTOCOL_VERSION과 같아야 함)
+WATCHER_FILE_PROTOCOL_VERSION = 2
+
+
 class FilePreprocessor:
     def __init__(self, 
                  pull_port=5555,           # file_watcher PUSH 소켓으로부터 수신
                  file_request_port=5556,   # file_watcher ROUTER 소켓에 요청
                  rep_port=5557,           # 다른 노드들의 요청 처리
-                 push_port=5558):         # 다음 노드로 전송
+                 push_port=5558,          # 다음 노드로 전송
+                 pull_endpoint=None,      # 지정하지 않으면 POSIX는 ipc, Windows는 tcp://127.0.0.1:pull_port
+                 file_request_endpoint=None,  # 지정하지 않으면 POSIX는 ipc, Windows는 tcp://127.0.0.1:file_request_port
+                 sndhwm=1000,             # PUSH 송신 대기열 최대 메시지 수
+                 push_linger=2000,        # 종료시 보내지 못한 메시지를 기다리는 시간 (ms)
+                 file_request_timeout=5000,  # file_watcher 파일 요청 응답 대기 시간 (ms)
+                 watch_folder=None):      # file_watcher 감시 폴더 (파일 요청 실패시 디스크에서 직접 읽을 때 사용)
         
         self.pull_port = pull_port
         self.file_request_port = file_request_port
+        self.pull_endpoint = pull_endpoint or (
+            WATCHER_PUSH_IPC_ENDPOINT if IPC_AVAILABLE else f"tcp://127.0.0.1:{pull_port}")
+        self.file_request_endpoint = file_request_endpoint or (
+            WATCHER_ROUTER_IPC_ENDPOINT if IPC_AVAILABLE else f"tcp://127.0.0.1:{file_request_port}")
         self.rep_port = rep_port
         self.push_port = push_port
         
@@ -209,11 +269,13 @@ class FilePreprocessor:
         
         # PULL 소켓 (file_watcher로부터 파일 변경사항 수신)
         self.pull_socket = self.context.socket(zmq.PULL)
-        self.pull_socket.connect(f"tcp://localhost:{self.pull_port}")
+        self.pull_socket.connect(self.pull_endpoint)
         
         # REQ 소켓 (file_watcher에게 파일 요청)
-        self.req_socket = self.context.socket(zmq.REQ)
-        self.req_socket.connect(f"tcp://localhost:{self.file_request_port}")
+        self.file_request_timeout = file_request_timeout
+        self.req_socket = None
+        self._connect_req_socket()
+        self.watch_folder = watch_folder
         
         # REP 소켓 (다른 노드들의 파일 요청 처리)
         self.rep_socket = self.context.socket(zmq.REP)
@@ -221,93 +283,218 @@ class FilePreprocessor:
         
         # PUSH 소켓 (다음 노드로 전송)
         self.push_socket = self.context.socket(zmq.PUSH)
+        # postprocessor가 느려도 송신 대기열에 sndhwm개까지 쌓아두고 이벤트 루프를 막지 않음
+        # 쌓인 메시지는 libzmq I/O 스레드가 한 번의 write로 묶어서 전송
+        # LINGER는 종료시 남은 메시지를 push_linger ms까지만 보내고 term()이 무한정 기다리지 않게 함
+        self.push_socket.setsockopt(zmq.SNDHWM, sndhwm)
+        self.push_socket.setsockopt(zmq.LINGER, push_linger)
         self.push_socket.bind(f"tcp://*:{self.push_port}")
         
+        # 이벤트 루프 깨우기용 inproc PAIR 소켓 (stop()이 보내면 poll이 바로 반환)
+        # 이벤트 루프가 주기적으로 깨어나 running을 확인하지 않아도 되도록 poll은 타임아웃 없이 대기
+        wake_endpoint = f"inproc://file_preprocessor-wake-{id(self)}"
+        self._wake_recv = self.context.socket(zmq.PAIR)
+        self._wake_recv.bind(wake_endpoint)
+        self._wake_send = self.context.socket(zmq.PAIR)
+        self._wake_send.connect(wake_endpoint)
+        
         # 실행 상태 플래그
         self.running = False
         
-        print(f"🔧 File Preprocessor 초기화 완료")
-        print(f"   📥 파일 변경사항 수신: PULL tcp://localhost:{self.pull_port}")
-        print(f"   📤 파일 요청: REQ tcp://localhost:{self.file_request_port}")
-        print(f"   🔄 파일 요청 처리: REP tcp://*:{self.rep_port}")
-        print(f"   📤 다음 노드 전송: PUSH tcp://*:{self.push_port}")
+        # 추출 텍스트 캐시 (file_path -> 추출된 텍스트)
+        # chunk 구간 요청이 같은 파일로 여러 번 와도 파일 전송/파싱은 한 번만 수행
+        self._content_cache = OrderedDict()
+        self._content_cache_max = 64
+        
+        # 마지막으로 처리한 파일 내용의 해시 (file_path -> _content_digest)
+        # 편집기 저장 등으로 같은 내용의 create/update가 반복되면 추출/전송을 건너뜀 (이벤트 루프 스레드에서만 사용)
+        self._content_hashes = OrderedDict()
+        self._content_hashes_max = 4096
+        
+        # event_type별 처리 함수 (메시지마다 문자열 비교를 이어가지 않고 dict 조회 한 번으로 분기)
+        self._event_handlers = {
+            'delete': self._on_delete,
+            'create': self._on_change,
+            'update': self._on_update,
+        }
+        
+        logger.info("🔧 File Preprocessor 초기화 완료")
+        logger.info("   📥 파일 변경사항 수신: PULL %s", self.pull_endpoint)
+        logger.info("   📤 파일 요청: REQ %s", self.file_request_endpoint)
+        logger.info("   🔄 파일 요청 처리: REP tcp://*:%s", self.rep_port)
+        logger.info("   📤 다음 노드 전송: PUSH tcp://*:%s", self.push_port)
     
-    def _extract_file_content(self, file_path: str, encoded_content: Optional[str] = None) -> Optional[str]:
+    def _extract_file_content(self, file_path: str, file_content: Union[bytes, memoryview, str, None] = None) -> Optional[str]:
         """
         파일에서 텍스트 내용을 추출합니다.
         
         Args:
             file_path: 파일 경로
-            encoded_content: base64 인코딩된 파일 내용 (있는 경우)
+            file_content: 파일 내용 (multipart 프레임으로 받은 bytes, 또는 이전 형식의 base64 문자열)
             
         Returns:
             추출된 텍스트 내용 또는 None
         """
         try:
-            if encoded_content:
-                # base64 디코딩된 내용으로 임시 파일 생성하여 처리
-                decoded_content = base64.b64decode(encoded_content)
-                temp_path = f"temp_{int(time.time())}_{os.path.basename(file_path)}"
-                
-                try:
-                    with open(temp_path, 'wb') as f:
-                        f.write(decoded_content)
-                    
-                    # file_reader로 내용 추출
-                    content = read_file(temp_path)
-                    return content
-                    
-                finally:
-                    # 임시 파일 삭제
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
-            else:
-                # 파일 경로로 직접 읽기
-                if os.path.exists(file_path):
-                    return read_file(file_path)
+            if file_content:
+                # 받은 내용을 임시 파일로 쓰지 않고 메모리에서 바로 추출 (str이면 이전 형식의 base64)
+                if isinstance(file_content, str):
+                    decoded_content = _b64decode(file_content)
                 else:
-                    print(f"⚠️ 파일을 찾을 수 없습니다: {file_path}")
-                    return None
+                    decoded_content = file_content
+                return read_file(file_path, decoded_content)
+            else:
+                # 파일 경로로 직접 읽기 (존재 여부는 read_file이 한 번만 확인)
+                # file_watcher가 보내는 경로는 감시 폴더 기준 상대 경로
+                if self.watch_folder and not os.path.isabs(file_path):
+                    file_path = os.path.join(self.watch_folder, file_path)
+                return read_file(file_path)
                     
+        except FileNotFoundError:
+            logger.warning("⚠️ 파일을 찾을 수 없습니다: %s", file_path)
+            return None
         except Exception as e:
-            print(f"❌ 파일 내용 추출 실패 ({file_path}): {e}")
+            logger.error("❌ 파일 내용 추출 실패 (%s): %s", file_path, e)
             return None
     
-    def _process_file_change(self, message: Dict[str, Any]):
+    def _get_cached_content(self, file_path: str) -> Optional[str]:
+        """캐시된 추출 텍스트를 반환합니다 (없으면 None)."""
+        content = self._content_cache.get(file_path)
+        if content is not None:
+            self._content_cache.move_to_end(file_path)
+        return content
+    
+    def _cache_content(self, file_path: str, content: Optional[str]):
+        """
+        추출 텍스트를 캐시에 저장합니다. content가 None이면 캐시에서 제거합니다.
+        file_watcher의 변경 알림(create/update/delete)마다 갱신되므로 오래된 내용이 남지 않습니다.
+        """
+        self._content_cache.pop(file_path, None)
+        if content is None:
+            return
+        self._content_cache[file_path] = content
+        while len(self._content_cache) > self._content_cache_max:
+            self._content_cache.popitem(last=False)
+    
+    def _remember_content_hash(self, file_path: str, content_hash: bytes):
+        """처리한 파일 내용의 해시를 기록합니다 (오래된 항목부터 제거)."""
+        self._content_hashes.pop(file_path, None)
+        self._content_hashes[file_path] = content_hash
+        while len(self._content_hashes) > self._content_hashes_max:
+            self._content_hashes.popitem(last=False)
+    
+    def _on_delete(self, message: Dict[str, Any], processed_message: Dict[str, Any], file_content) -> bool:
+        """삭제: 캐시를 비우고 파일 경로만 전송합니다."""
+        file_path = message.get('file_path')
+        self._cache_content(file_path, None)
+        self._content_hashes.pop(file_path, None)
+        processed_message['content'] = None
+        processed_message['status'] = 'deleted'
+        return True
+    
+    def _on_update(self, message: Dict[str, Any], processed_message: Dict[str, Any], file_content) -> bool:
+        """수정: 직전에 보낸 것과 같은 diff면 파일을 다시 추출하지 않고 건너뜁니다."""
+        if message.get('diff_unchanged'):
+            logger.info("⏭️ 이전과 같은 변경사항이라 UPDATE 이벤트를 전송하지 않습니다: %s (diff_hash: %s)",
+                        message.get('file_path'), message.get('diff_hash'))
+            return False
+        return self._on_change(message, processed_message, file_content)
+    
+    def _on_change(self, message: Dict[str, Any], processed_message: Dict[str, Any], file_content) -> bool:
+        """생성/수정: 파일 내용을 추출해 processed_message를 채웁니다."""
+        event_type = message.get('event_type')
+        file_path = message.get('file_path')
+        
+        # diff만 온 수정 이벤트면 파일 내용은 file_watcher ROUTER 소켓으로 요청
+        if not file_content and message.get('fetch_hint') == 'router':
+            watcher_response = self._request_file_from_watcher(file_path)
+            if watcher_response and watcher_response.get('status') == 'success':
+                file_content = watcher_response.get('file_content')
+            else:
+                logger.warning("⚠️ file_watcher에서 파일 내용을 받지 못해 디스크에서 읽습니다: %s", file_path)
+        
+        # 마지막으로 처리한 내용과 같으면 추출/전송하지 않음
+        content_hash = None
+        if file_content:
+            data = file_content.encode() if isinstance(file_content, str) else file_content
+            content_hash = _content_digest(data)
+            if self._content_hashes.get(file_path) == content_hash:
+                logger.info("⏭️ 이전에 처리한 내용과 같아 %s 이벤트를 전송하지 않습니다: %s", event_type.upper(), file_path)
+                return False
+        
+        # 생성/수정: 파일 내용 추출
+        extracted_content = self._extract_file_content(str(file_path), file_content)
+        # 변경된 파일의 추출 텍스트로 캐시 갱신 (실패시 캐시에서 제거)
+        self._cache_content(file_path, extracted_content or None)
+        
+        if extracted_content:
+            if content_hash is not None:
+                self._remember_content_hash(file_path, content_hash)
+            processed_message['content'] = extracted_content
+            processed_message['content_length'] = len(extracted_content)
+            processed_message['status'] = 'processed'
+            
+            # 수정인 경우 diff 정보도 포함
+            if event_type == 'update':
+                diff_type = message.get('diff_type')
+                diff_content = message.get('diff_content')
+                
+                # diff_content가 없거나 의미없는 변경사항인 경우 처리 건너뛰기
+                if not diff_content or not diff_content.strip():
+                    logger.info("⏭️ 실제 변경사항이 없어 UPDATE 이벤트를 전송하지 않습니다 (파일 접근만 발생): %s", file_path)
+                    return False  # 다음 노드로 전송하지 않음
+                
+                processed_message['diff_type'] = diff_type
+                processed_message['diff_content'] = diff_content
+                processed_message['relative_path'] = message.get('relative_path')
+                processed_message['diff_ranges'] = message.get('diff_ranges')
+                processed_message['diff_hash'] = message.get('diff_hash')
+                
+            logger.debug("✅ 파일 내용 추출 완료: %d 문자", len(extracted_content))
+        else:
+            processed_message['content'] = None
+            processed_message['status'] = 'extraction_failed'
+            logger.warning("❌ 파일 내용 추출 실패: %s", file_path)
+        return True
+    
+    def _process_file_change(self, message: Dict[str, Any], file_bytes: Union[bytes, memoryview, None] = None):
         """
         파일 변경사항을 처리합니다.
         
         Args:
-            message: file_watcher로부터 받은 메시지
+            message: file_watcher로부터 받은 메시지 헤더
+            file_bytes: 헤더 다음 프레임으로 받은 파일 내용 (없으면 None)
         """
         try:
             event_type = message.get('event_type')
             file_path = message.get('file_path')
             user_id = message.get('user_id')
             timestamp = message.get('timestamp')
-            file_content = message.get('file_content')  # base64 encoded
+            # 파일 내용은 별도 프레임으로 오며, 이전 형식이면 헤더의 base64 file_content 사용
+            file_content = file_bytes if file_bytes is not None else message.get('file_content')
             
             # 메시지 수신 로그 출력
-            print(f"� [RECEIVE <- file_watcher] 파일 변경사항 수신")
-            print(f"   📄 파일: {file_path}")
-            print(f"   📋 이벤트: {event_type}")
-            print(f"   👤 사용자: {user_id}")
-            print(f"   📅 타임스탬프: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}")
+            logger.info("📥 [RECEIVE <- file_watcher] %s %s", event_type, file_path)
             
-            if event_type != 'delete':
-                file_size = message.get('file_size', 0)
-                print(f"   📏 파일 크기: {file_size:,} bytes")
-                has_content = bool(file_content)
-                print(f"   🔒 Base64 인코딩: {'✅' if has_content else '❌'}")
-                
-                if event_type == 'update':
+            # 상세한 수신 정보는 DEBUG 레벨에서만 문자열을 만듦
+            if logger.isEnabledFor(logging.DEBUG):
+                lines = [
+                    f"   👤 사용자: {user_id}",
+                    f"   📅 타임스탬프: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp))}",
+                ]
+                if event_type != 'delete':
+                    lines.append(f"   📏 파일 크기: {message.get('file_size', 0):,} bytes")
+                    has_content = bool(file_content)
+                    if not has_content and message.get('fetch_hint') == 'router':
+                        lines.append("   📦 파일 내용: diff만 수신 (ROUTER로 요청)")
+                    else:
+                        lines.append(f"   📦 파일 내용: {'✅' if has_content else '❌'}")
+                    
                     diff_type = message.get('diff_type')
-                    diff_content = message.get('diff_content')
-                    if diff_type:
-                        print(f"   📊 Diff 타입: {diff_type}")
-                        print(f"   📊 Diff 크기: {len(diff_content)} chars" if diff_content else "   📊 Diff: 없음")
-            
-            print("   " + "-" * 50)
+                    if event_type == 'update' and diff_type:
+                        diff_content = message.get('diff_content')
+                        lines.append(f"   📊 Diff: {diff_type} ({len(diff_content) if diff_content else 0} chars)")
+                logger.debug("\n".join(lines))
             
             # 다음 노드로 전송할 메시지 구성
             processed_message = {
@@ -320,64 +507,25 @@ class FilePreprocessor:
                 'processor': 'file_preprocessor'
             }
             
-            if event_type == 'delete':
-                # 삭제: 파일 경로만 전송
-                processed_message['content'] = None
-                processed_message['status'] = 'deleted'
-                
-            elif event_type in ['create', 'update']:
-                # 생성/수정: 파일 내용 추출
-                extracted_content = self._extract_file_content(str(file_path), file_content)
-                
-                if extracted_content:
-                    processed_message['content'] = extracted_content
-                    processed_message['content_length'] = len(extracted_content)
-                    processed_message['status'] = 'processed'
-                    
-                    # 수정인 경우 diff 정보도 포함
-                    if event_type == 'update':
-                        diff_type = message.get('diff_type')
-                        diff_content = message.get('diff_content')
-                        
-                        # diff_content가 없거나 의미없는 변경사항인 경우 처리 건너뛰기
-                        if not diff_content or not diff_content.strip():
-                            print(f"⚠️ 실제 변경사항이 없어 UPDATE 이벤트를 전송하지 않습니다.")
-                            print(f"   📄 파일 접근만 발생한 것으로 판단됩니다.")
-                            print("   " + "-" * 50)
-                            return  # 다음 노드로 전송하지 않음
-                        
-                        processed_message['diff_type'] = diff_type
-                        processed_message['diff_content'] = diff_content
-                        processed_message['relative_path'] = message.get('relative_path')
-                        
-                    print(f"✅ 파일 내용 추출 완료: {len(extracted_content)} 문자")
-                else:
-                    processed_message['content'] = None
-                    processed_message['status'] = 'extraction_failed'
-                    print(f"❌ 파일 내용 추출 실패: {file_path}")
+            # 이벤트 종류별 처리 (False를 반환하면 다음 노드로 전송하지 않음)
+            handler = self._event_handlers.get(event_type)
+            if handler is not None and not handler(message, processed_message, file_content):
+                return
             
-            # 다음 노드로 전송
-            self.push_socket.send_json(processed_message)
+            # 다음 노드로 전송: [msgpack 헤더, 추출 텍스트 UTF-8 bytes] 두 프레임
+            # 큰 텍스트를 헤더와 함께 인코딩하지 않고 별도 프레임으로 복사 없이 전송 (내용이 없으면 빈 프레임)
+            content = processed_message.pop('content', None)
+            payload = content.encode('utf-8') if content else b''
+            self.push_socket.send_multipart(
+                [msgpack.packb(processed_message, use_bin_type=True), payload], copy=False
+            )
             
             # 전송 로그 출력
-            print(f"📤 [SEND -> file_postprocessor] 처리된 파일 정보 전송")
-            print(f"   📄 파일: {file_path}")
-            print(f"   📋 이벤트: {event_type}")
-            print(f"   ✅ 처리 상태: {processed_message.get('status')}")
-            
-            if processed_message.get('content'):
-                content_length = processed_message.get('content_length', 0)
-                print(f"   📏 추출된 내용 길이: {content_length:,} 문자")
-            
-            if event_type == 'update' and processed_message.get('diff_content'):
-                print(f"   📊 Diff 정보: 포함됨")
-            
-            print(f"   📅 처리 시간: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(processed_message['processed_timestamp']))}")
-            print(f"   🚀 전송 포트: tcp://*:{self.push_port}")
-            print("   " + "-" * 50)
+            logger.info("📤 [SEND -> file_postprocessor] %s %s (%s, %d 문자)", event_type, file_path,
+                        processed_message.get('status'), processed_message.get('content_length', 0))
             
         except Exception as e:
-            print(f"❌ 파일 변경사항 처리 중 오류: {e}")
+            logger.error("❌ 파일 변경사항 처리 중 오류: %s", e)
     
     def _request_file_from_watcher(self, file_path: str) -> Optional[Dict[str, Any]]:
         """
@@ -392,167 +540,217 @@ class FilePreprocessor:
         try:
             # file_watcher에게 파일 요청
             request = {'file_path': file_path}
-            print(f"📤 [REQUEST -> file_watcher] 파일 요청 전송: {file_path}")
-            self.req_socket.send_json(request)
+            logger.debug("📤 [REQUEST -> file_watcher] 파일 요청 전송: %s", file_path)
+            self.req_socket.send(msgpack.packb(request, use_bin_type=True))
             
             # 응답 수신 (타임아웃 설정)
-            if self.req_socket.poll(timeout=5000):  # 5초 타임아웃
-                response = self.req_socket.recv_json()
-                if isinstance(response, dict):
-                    print(f"📥 [RECEIVE <- file_watcher] 응답 수신: {response.get('status', 'unknown')}")
-                    return response
-                else:
-                    print(f"⚠️ 예상하지 못한 응답 형식: {response}")
+            if not self.req_socket.poll(timeout=self.file_request_timeout):
+                logger.warning("⏰ file_watcher 응답 타임아웃: %s", file_path)
+                self._connect_req_socket()
+                return None
+            # 응답 형식: [msgpack 헤더(, 파일 내용 bytes)] - 수신 버퍼를 bytes로 복사하지 않고 memoryview로 사용
+            frames = self.req_socket.recv_multipart(copy=False)
+            
+            response = msgpack.unpackb(frames[0].buffer, raw=False)
+            if isinstance(response, dict):
+                if response.get('version') != WATCHER_FILE_PROTOCOL_VERSION:
+                    logger.warning("⚠️ file_watcher 프로토콜 버전 불일치: %s (필요: %s)",
+                                   response.get('version'), WATCHER_FILE_PROTOCOL_VERSION)
                     return None
+                if len(frames) > 1:
+                    response['file_content'] = frames[1].buffer
+                logger.debug("📥 [RECEIVE <- file_watcher] 응답 수신: %s", response.get('status', 'unknown'))
+                return response
             else:
-                print(f"⏰ file_watcher 응답 타임아웃: {file_path}")
+                logger.warning("⚠️ 예상하지 못한 응답 형식: %s", response)
                 return None
                 
         except Exception as e:
-            print(f"❌ file_watcher 요청 중 오류: {e}")
+            logger.error("❌ file_watcher 요청 중 오류: %s", e)
+            # 송수신 도중 실패하면 REQ 상태가 어긋나 이후 요청이 모두 실패하므로 소켓을 새로 만듦
+            if isinstance(e, zmq.ZMQError):
+                self._connect_req_socket()
             return None
     
+    def _connect_req_socket(self):
+        """
+        file_watcher REQ 소켓을 (다시) 연결합니다.
+        REQ는 응답을 받기 전에는 다음 요청을 보낼 수 없으므로, 응답을 못 받은 소켓은 버리고 새로 만듭니다.
+        """
+        if self.req_socket is not None:
+            self.req_socket.close(linger=0)
+        self.req_socket = self.context.socket(zmq.REQ)
+        self.req_socket.setsockopt(zmq.LINGER, 0)
+        self.req_socket.connect(self.file_request_endpoint)
+    
+    def _send_reply(self, response: Dict[str, Any]):
+        """retriever에게 msgpack으로 인코딩한 응답을 전송합니다."""
+        self.rep_socket.send(msgpack.packb(response, use_bin_type=True))
+    
     def _handle_file_request(self):
         """
-        다른 노드들의 파일 요청을 처리합니다.
+        REP 소켓으로 들어온 다른 노드의 파일 요청 하나를 처리합니다.
         """
-        while self.running:
-            try:
-                # 파일 요청 수신 (타임아웃 설정)
-                if self.rep_socket.poll(timeout=1000):  # 1초 타임아웃
-                    request = self.rep_socket.recv_json()
-                    
-                    if not isinstance(request, dict):
-                        print(f"⚠️ 잘못된 요청 형식: {request}")
-                        self.rep_socket.send_json({
-                            'status': 'error',
-                            'error': '잘못된 요청 형식'
-                        })
-                        continue
-                    
-                    file_path = request.get('file_path')
-                    if not file_path or not isinstance(file_path, str):
-                        print(f"⚠️ 잘못된 파일 경로: {file_path}")
-                        self.rep_socket.send_json({
-                            'status': 'error',
-                            'error': '유효하지 않은 파일 경로'
-                        })
-                        continue
-                        
-                    print(f"📥 [REQUEST] 파일 요청 수신: {file_path}")
+        try:
+            # retriever와는 msgpack으로 통신 (큰 한글 텍스트의 JSON escape/파싱 비용 제거)
+            request = msgpack.unpackb(self.rep_socket.recv(copy=False).buffer, raw=False)
+            
+            if not isinstance(request, dict):
+                logger.warning("⚠️ 잘못된 요청 형식: %s", request)
+                self._send_reply({
+                    'status': 'error',
+                    'error': '잘못된 요청 형식'
+                })
+                return
+            
+            file_path = request.get('file_path')
+            if not file_path or not isinstance(file_path, str):
+                logger.warning("⚠️ 잘못된 파일 경로: %s", file_path)
+                self._send_reply({
+                    'status': 'error',
+                    'error': '유효하지 않은 파일 경로',
+                    'request_id': request.get('request_id')
+                })
+                return
+                
+            logger.debug("📥 [REQUEST] 파일 요청 수신: %s", file_path)
+            
+            extracted_content = self._get_cached_content(file_path)
+            if extracted_content is not None:
+                logger.debug("♻️ 캐시된 추출 텍스트 사용: %d 문자", len(extracted_content))
+                response = {
+                    'status': 'success',
+                    'file_path': file_path
+                }
+            else:
+                # file_watcher에게 파일 요청
+                logger.debug("🔄 [REQUEST -> file_watcher] 파일 데이터 요청 중...")
+                watcher_response = self._request_file_from_watcher(file_path)
+                
+                if watcher_response and watcher_response.get('status') == 'success':
+                    logger.debug("✅ [RECEIVE <- file_watcher] 파일 데이터 수신 성공: %d bytes",
+                                 watcher_response.get('file_size', 0))
                     
-                    # file_watcher에게 파일 요청
-                    print(f"🔄 [REQUEST -> file_watcher] 파일 데이터 요청 중...")
-                    watcher_response = self._request_file_from_watcher(file_path)
+                    # 파일 내용 추출
+                    file_content = watcher_response.get('file_content')
+                    extracted_content = self._extract_file_content(file_path, file_content)
                     
-                    if watcher_response and watcher_response.get('status') == 'success':
-                        print(f"✅ [RECEIVE <- file_watcher] 파일 데이터 수신 성공")
-                        file_size = watcher_response.get('file_size', 0)
-                        print(f"   📏 파일 크기: {file_size:,} bytes")
-                        
-                        # 파일 내용 추출
-                        file_content = watcher_response.get('file_content')
-                        extracted_content = self._extract_file_content(file_path, file_content)
-                        
-                        if extracted_content:
-                            response = {
-                                'status': 'success',
-                                'file_path': file_path,
-                                'content': extracted_content,
-                                'content_length': len(extracted_content),
-                                'file_name': watcher_response.get('file_name'),
-                                'file_size': watcher_response.get('file_size')
-                            }
-                            print(f"✅ 파일 내용 추출 완료: {len(extracted_content):,} 문자")
-                            print(f"📤 [RESPONSE] 클라이언트에게 응답 전송")
-                        else:
-                            response = {
-                                'status': 'error',
-                                'error': '파일 내용 추출 실패',
-                                'file_path': file_path
-                            }
-                            print(f"❌ 파일 내용 추출 실패")
+                    if extracted_content:
+                        self._cache_content(file_path, extracted_content)
+                        response = {
+                            'status': 'success',
+                            'file_path': file_path,
+                            'file_name': watcher_response.get('file_name'),
+                            'file_size': watcher_response.get('file_size')
+                        }
+                        logger.debug("✅ 파일 내용 추출 완료: %d 문자", len(extracted_content))
                     else:
-                        error_msg = watcher_response.get('error', 'file_watcher 요청 실패') if watcher_response else 'file_watcher 응답 없음'
-                        print(f"❌ [ERROR <- file_watcher] {error_msg}")
                         response = {
                             'status': 'error',
-                            'error': error_msg,
+                            'error': '파일 내용 추출 실패',
                             'file_path': file_path
                         }
-                    
-                    # 응답 전송
-                    self.rep_socket.send_json(response)
-                    
-            except Exception as e:
-                if self.running:  # 종료 중이 아닌 경우에만 에러 출력
-                    print(f"❌ 파일 요청 처리 중 오류: {e}")
+                        logger.warning("❌ 파일 내용 추출 실패: %s", file_path)
+                else:
+                    error_msg = watcher_response.get('error', 'file_watcher 요청 실패') if watcher_response else 'file_watcher 응답 없음'
+                    logger.error("❌ [ERROR <- file_watcher] %s", error_msg)
+                    response = {
+                        'status': 'error',
+                        'error': error_msg,
+                        'file_path': file_path
+                    }
+            
+            if response['status'] == 'success':
+                # start_pos/end_pos가 있으면 해당 구간만 잘라서 응답 (chunk 요청)
+                start_pos = request.get('start_pos')
+                end_pos = request.get('end_pos')
+                if start_pos is not None or end_pos is not None:
+                    extracted_content = extracted_content[start_pos:end_pos]
+                    response['start_pos'] = start_pos
+                    response['end_pos'] = end_pos
+                response['content'] = extracted_content
+                response['content_length'] = len(extracted_content)
+                logger.debug("📤 [RESPONSE] 클라이언트에게 응답 전송")
+            
+            # 응답 전송 (파이프라인 요청을 보낸 클라이언트가 응답을 구분할 수 있도록 request_id를 되돌려줌)
+            response['request_id'] = request.get('request_id')
+            self._send_reply(response)
+
+        except Exception as e:
+            logger.error("❌ 파일 요청 처리 중 오류: %s", e)
     
-    def _listen_file_changes(self):
+    def _handle_file_change(self):
         """
-        file_watcher로부터 파일 변경사항을 수신합니다.
+        PULL 소켓으로 들어온 file_watcher의 파일 변경사항 하나를 처리합니다.
         """
-        while self.running:
-            try:
-                # 파일 변경사항 수신 (타임아웃 설정)
-                if self.pull_socket.poll(timeout=1000):  # 1초 타임아웃
-                    message = self.pull_socket.recv_json()
-                    
-                    if isinstance(message, dict):
-                        self._process_file_change(message)
-                    else:
-                        print(f"⚠️ 잘못된 메시지 형식: {message}")
-                    
-            except Exception as e:
-                if self.running:  # 종료 중이 아닌 경우에만 에러 출력
-                    print(f"❌ 파일 변경사항 수신 중 오류: {e}")
+        try:
+            # 메시지 형식: [JSON 헤더(, 파일 내용 bytes)] - 수신 버퍼를 bytes로 복사하지 않고 memoryview로 사용
+            frames = self.pull_socket.recv_multipart(copy=False)
+            message = _loads(frames[0].buffer)
+            
+            if isinstance(message, dict):
+                self._process_file_change(message, frames[1].buffer if len(frames) > 1 else None)
+            else:
+                logger.warning("⚠️ 잘못된 메시지 형식: %s", message)
+                
+        except Exception as e:
+            logger.error("❌ 파일 변경사항 수신 중 오류: %s", e)
     
     def start(self):
         """
         File Preprocessor를 시작합니다.
         """
-        print("=" * 60)
-        print("🔮 DB Sorcerer File Preprocessor 시작")
-        print("=" * 60)
+        logger.info("🔮 DB Sorcerer File Preprocessor 시작")
         
         self.running = True
         
-        # 파일 변경사항 수신 스레드
-        change_thread = threading.Thread(target=self._listen_file_changes, daemon=True)
-        change_thread.start()
-        
-        # 파일 요청 처리 스레드
-        request_thread = threading.Thread(target=self._handle_file_request, daemon=True)
-        request_thread.start()
+        # 한 스레드에서 PULL(파일 변경사항)과 REP(파일 요청)를 함께 기다림
+        # REQ 소켓과 캐시를 스레드 사이에서 공유하지 않으므로 잠금이 필요 없음
+        poller = zmq.Poller()
+        poller.register(self.pull_socket, zmq.POLLIN)
+        poller.register(self.rep_socket, zmq.POLLIN)
+        poller.register(self._wake_recv, zmq.POLLIN)
         
         try:
-            print("\n📋 서비스 상태:")
-            print(f"  • 파일 변경사항 수신: 활성화됨")
-            print(f"  • 파일 요청 처리: 활성화됨")
-            print(f"  • 다음 노드 전송: 대기 중")
-            print("\n⏹️  종료하려면 Ctrl+C를 누르세요")
-            print("-" * 60)
+            logger.info("📋 파일 변경사항 수신/파일 요청 처리 활성화됨 (종료하려면 Ctrl+C)")
+            
+            # POSIX는 poll 중에도 Ctrl+C가 KeyboardInterrupt로 전달되지만, Windows의 zmq_poll은
+            # SIGINT로 깨어나지 않으므로 1초마다 poll에서 돌아와 KeyboardInterrupt를 받을 수 있게 함
+            poll_timeout = 1000 if os.name == 'nt' else None
             
-            while True:
-                time.sleep(1)
+            while self.running:
+                # 메시지나 stop() 신호가 올 때까지 대기
+                events = dict(poller.poll(poll_timeout))
+                if self._wake_recv in events:
+                    self._wake_recv.recv()
+                    continue
+                if self.pull_socket in events:
+                    self._handle_file_change()
+                if self.rep_socket in events:
+                    self._handle_file_request()
                 
         except KeyboardInterrupt:
-            print("\n\n🛑 시스템 종료 중...")
+            logger.info("🛑 시스템 종료 중...")
             self.running = False
             
-            # 스레드 종료 대기
-            change_thread.join(timeout=1)
-            request_thread.join(timeout=1)
-            
         finally:
             # ZeroMQ 정리
             self.pull_socket.close()
             self.req_socket.close()
             self.rep_socket.close()
             self.push_socket.close()
+            self._wake_recv.close()
+            self._wake_send.close()
             self.context.term()
             
-            print("✅ File Preprocessor 종료 완료")
+            logger.info("✅ File Preprocessor 종료 완료")
+    
+    def stop(self):
+        """
+        다른 스레드에서 이벤트 루프를 종료합니다 (한 스레드에서만 호출).
+        """
+        self.running = False
+        self._wake_send.send(b'')
 
 
 def main():
@@ -562,17 +760,24 @@ def main():
     FILE_REQUEST_PORT = 5556  # file_watcher ROUTER 소켓에 요청
     REP_PORT = 5557       # 다른 노드들의 요청 처리
     PUSH_PORT = 5558      # 다음 노드로 전송
+    WATCH_FOLDER = "../STORAGEside/test_files"  # oracle.py의 WATCH_FOLDER (RAGside에서 실행 기준)
     
     # FilePreprocessor 인스턴스 생성 및 시작
     preprocessor = FilePreprocessor(
         pull_port=PULL_PORT,
         file_request_port=FILE_REQUEST_PORT,
         rep_port=REP_PORT,
-        push_port=PUSH_PORT
+        push_port=PUSH_PORT,
+        watch_folder=WATCH_FOLDER
     )
     
     preprocessor.start()
 
 
 if __name__ == "__main__":
-    main()
+    log_listener = setup_logging(logging.INFO)
+    try:
+        main()
+    finally:
+        # 큐에 남은 로그를 모두 출력하고 listener 스레드 종료
+        log_listener.stop()
@@ -0,0 +1,25 @@
+"""
+RAGside 프로세스 공용 로깅 설정
+"""
+
+import sys
+import logging
+import logging.handlers
+import queue
+
+
+def setup_logging(level=logging.INFO):
+    """
+    로그를 QueueHandler로 큐에 넣고, 별도 QueueListener 스레드가 stdout에 출력하도록 설정
+    로그를 남기는 스레드는 stdout 쓰기를 기다리지 않음. 반환된 listener는 종료시 stop() 호출
+    """
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+    listener.start()
+    return listener
@@ -5,12 +5,17 @@
 """
 
 import zmq
+import msgspec
 import time
 import threading
 from flask import Flask, jsonify
 from flask_cors import CORS
 from collections import defaultdict
 
+# ZMQ 요청/응답 JSON은 msgspec 사용 (postprocessor와 같은 형식, 표준 json보다 빠름)
+_dumps = msgspec.json.Encoder().encode
+_loads = msgspec.json.decode
+
 
 class MessageDB:
     def __init__(self, zmq_port=5560, flask_port=5001):
@@ -76,7 +81,7 @@ class MessageDB:
             try:
                 if self.rep_socket.poll(timeout=1000):
                     # 메시지 수신
-                    request = self.rep_socket.recv_json()
+                    request = _loads(self.rep_socket.recv())
                     print(f"📥 ZMQ 메시지 수신: {request}")
                     
                     # 메시지 처리
@@ -92,7 +97,7 @@ class MessageDB:
                         response = {'status': 'error', 'error': 'user_list 및 message가 필요합니다'}
                     
                     # 응답 전송
-                    self.rep_socket.send_json(response)
+                    self.rep_socket.send(_dumps(response))
                     
             except Exception as e:
                 if self.running:
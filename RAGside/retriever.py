@@ -5,20 +5,56 @@
 """
 
 import zmq
-import json
-import sys
+import msgpack
+import msgspec
 import os
+import time
+import uuid
+import atexit
+import threading
+import hashlib
+import functools
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Dict, Any, List
 
-from Models.embedding import Embedding
-from Models.reranker import Reranker
-from db import search_data
+from db import search_data_batch, normalize
+
+logger = logging.getLogger(__name__)
+
+# oracle 권한 요청/응답은 msgspec으로 JSON 인코딩/디코딩 (표준 json보다 빠름)
+_dumps = msgspec.json.Encoder().encode
+_loads = msgspec.json.decode
+
+
+# embedding / reranker 클라이언트는 검색할 때만 필요하므로 처음 사용할 때 import
+# (get_file_content만 쓰는 경우에는 로드하지 않음)
+@functools.lru_cache(maxsize=None)
+def _load_embedding():
+    """(Embedding 함수, 모델명)을 반환"""
+    from Models.embedding import Embedding, model_name
+    return Embedding, model_name
+
+
+@functools.lru_cache(maxsize=None)
+def _load_reranker():
+    """Reranker 함수를 반환"""
+    from Models.reranker import Reranker
+    return Reranker
+
+
+@atexit.register
+def _destroy_shared_context():
+    """프로세스 종료 시 공유 ZeroMQ 컨텍스트를 정리 (남은 소켓이 종료를 막지 않도록 linger=0)"""
+    zmq.Context.instance().destroy(linger=0)
 
 
 class FileRetriever:
     """파일을 요청하고 내용을 받아오는 간단한 클라이언트"""
     
-    def __init__(self, preprocessor_host="localhost", preprocessor_port=5557, oracle_host="localhost", oracle_port=5559, user_id=None):
+    def __init__(self, preprocessor_host="localhost", preprocessor_port=5557, oracle_host="localhost", oracle_port=5559, user_id=None, max_workers: int = 8,
+                 file_cache_max_bytes: int = 128 * 1024 * 1024, file_cache_ttl: float = 30.0, ann_overfetch: int = 2):
         """
         Args:
             preprocessor_host: file_preprocessor 서버 주소
@@ -26,6 +62,10 @@ class FileRetriever:
             oracle_host: oracle 서버 주소 (access 함수용)
             oracle_port: oracle 서버 포트 (기본값: 5559)
             user_id: 사용자 ID (권한 확인용, 필수)
+            max_workers: 백그라운드 I/O 작업용 최대 스레드 수 (기본값: 8)
+            file_cache_max_bytes: 파일 내용 캐시의 최대 크기 (문자 수 기준, 기본값: 128MB)
+            file_cache_ttl: 캐시된 파일 내용을 재사용할 최대 시간 (초, 기본값: 30초)
+            ann_overfetch: reranking 전에 ChromaDB에서 가져올 후보 배수 (top_n * ann_overfetch, 기본값: 2)
         """
         if not user_id:
             raise ValueError("사용자 ID가 필요합니다. 접근이 거부되었습니다.")
@@ -35,17 +75,48 @@ class FileRetriever:
         self.oracle_host = oracle_host
         self.oracle_port = oracle_port
         self.user_id = user_id
+        self.max_workers = max_workers
+        self.ann_overfetch = ann_overfetch
         
         # ZeroMQ 컨텍스트와 소켓 초기화
-        self.context = zmq.Context()
-        self.socket = self.context.socket(zmq.REQ)
+        # 컨텍스트는 프로세스 전역 싱글톤을 공유 (retriever마다 IO 스레드를 만들지 않음)
+        # io_threads는 싱글톤이 처음 만들어질 때만 적용됨
+        self.context = zmq.Context.instance(io_threads=max(1, (os.cpu_count() or 1) // 4))
+        # REQ는 send→recv 순서를 강제하므로 DEALER로 여러 요청을 연달아 보내고 응답은 request_id로 구분
+        self.socket = self.context.socket(zmq.DEALER)
+        self.socket.setsockopt(zmq.SNDHWM, 1000)
+        self.socket.setsockopt(zmq.RCVHWM, 1000)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.setsockopt(zmq.TCP_KEEPALIVE, 1)
         self.socket.connect(f"tcp://{preprocessor_host}:{preprocessor_port}")
+        # DEALER 소켓에 대한 요청/응답 묶음이 스레드 간에 섞이지 않도록 보호
+        self._socket_lock = threading.Lock()
         
-        print(f"📡 FileRetriever 연결됨: tcp://{preprocessor_host}:{preprocessor_port}")
-        print(f"🔑 Oracle 연결됨: tcp://{oracle_host}:{oracle_port}")
-        print(f"🗄️ db.py 연결됨")
+        # query embedding LRU 캐시 ((모델명, query 해시) -> 정규화된 벡터)
+        self._emb_cache = OrderedDict()
+        self._emb_cache_max = 1024
+        
+        # 파일 내용 LRU 캐시 (file_path -> (저장 시각, 내용)), 전체 크기로 제한
+        # 같은 파일에서 여러 chunk가 나와도 파일은 한 번만 받아온다
+        self._file_cache = OrderedDict()
+        self._file_cache_bytes = 0
+        self._file_cache_max_bytes = file_cache_max_bytes
+        self._file_cache_ttl = file_cache_ttl
+        
+        # ANN 검색 결과 LRU 캐시 ((query 해시, pathlist 해시) -> (저장 시각, 검색 개수, chunk 목록))
+        # 검색 개수는 2의 거듭제곱으로 올려서 저장하므로 top_n을 늘려 다시 검색해도 ChromaDB를 다시 조회하지 않는다
+        self._ann_cache = OrderedDict()
+        self._ann_cache_max = 256
+        self._ann_cache_ttl = file_cache_ttl
+        
+        # 권한 조회처럼 embedding 생성과 겹쳐 실행할 I/O 작업용 스레드 풀
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        
+        logger.info("📡 FileRetriever 연결됨: tcp://%s:%s", preprocessor_host, preprocessor_port)
+        logger.info("🔑 Oracle 연결됨: tcp://%s:%s", oracle_host, oracle_port)
+        logger.info("🗄️ db.py 연결됨")
         if user_id:
-            print(f"👤 사용자 ID: {user_id}")
+            logger.info("👤 사용자 ID: %s", user_id)
     
     def _get_user_accessible_files(self, user_id: str) -> List[str]:
         """
@@ -64,33 +135,34 @@ class FileRetriever:
         try:
             # Oracle 서버에 REQ 소켓으로 연결
             oracle_socket = self.context.socket(zmq.REQ)
+            oracle_socket.setsockopt(zmq.LINGER, 0)
             oracle_socket.connect(f"tcp://{self.oracle_host}:{self.oracle_port}")
             
             # access 요청 전송
             request = {"user_id": user_id}
-            oracle_socket.send_json(request)
+            oracle_socket.send(_dumps(request))
             
             # 응답 수신 (5초 타임아웃)
             if oracle_socket.poll(timeout=5000):
-                response = oracle_socket.recv_json()
+                response = _loads(oracle_socket.recv())
                 
                 if response.get('status') == 'success':
                     pathlist = response.get('pathlist', [])
-                    print(f"🔑 Oracle에서 권한 정보 수신: {len(pathlist)}개 파일")
+                    logger.debug("🔑 Oracle에서 권한 정보 수신: %d개 파일", len(pathlist))
                     oracle_socket.close()
                     return pathlist
                 else:
                     error_msg = response.get('error', '알 수 없는 오류')
-                    print(f"❌ Oracle 권한 조회 실패: {error_msg}")
+                    logger.warning("❌ Oracle 권한 조회 실패: %s", error_msg)
                     oracle_socket.close()
                     return []
             else:
-                print(f"⏰ Oracle 응답 타임아웃")
+                logger.warning("⏰ Oracle 응답 타임아웃")
                 oracle_socket.close()
                 return []
                 
         except Exception as e:
-            print(f"❌ Oracle 통신 오류: {e}")
+            logger.warning("❌ Oracle 통신 오류: %s", e)
             return []
     
     def get_file_content(self, file_path: str, timeout_ms: int = 5000) -> Optional[str]:
@@ -104,87 +176,270 @@ class FileRetriever:
         Returns:
             파일의 텍스트 내용 또는 None (실패시)
         """
-        try:
-            print(f"📄 파일 요청: {file_path}")
-            
-            # 요청 메시지 구성
-            request = {"file_path": file_path}
+        return self._get_file_contents([file_path], timeout_ms=timeout_ms).get(file_path)
+    
+    def _get_file_contents(self, file_paths: List[str], timeout_ms: int = 5000) -> Dict[str, Optional[str]]:
+        """
+        여러 파일의 내용을 가져옵니다. 캐시에 없는 파일만 한 번씩 요청합니다.
+        
+        Returns:
+            {file_path: 파일의 텍스트 내용 또는 None (실패시)}
+        """
+        contents = {}
+        missing = []
+        now = time.monotonic()
+        for file_path in dict.fromkeys(file_paths):
+            cached = self._file_cache.get(file_path)
+            if cached is not None and now - cached[0] < self._file_cache_ttl:
+                self._file_cache.move_to_end(file_path)
+                contents[file_path] = cached[1]
+            else:
+                missing.append(file_path)
+        
+        if missing:
+            with self._socket_lock:
+                request_ids = [self.send_file_request(file_path) for file_path in missing]
+                responses = self.recv_file_responses(request_ids, timeout_ms=timeout_ms)
+            for file_path, request_id in zip(missing, request_ids):
+                content = responses.get(request_id)
+                contents[file_path] = content
+                if content is not None:
+                    self._cache_file_content(file_path, content)
+        
+        return contents
+    
+    def get_chunk_content(self, file_path: str, start_pos: int, end_pos: int, timeout_ms: int = 5000) -> Optional[str]:
+        """
+        파일 전체가 아니라 [start_pos, end_pos) 구간의 텍스트만 file_preprocessor에 요청합니다.
+        
+        Returns:
+            chunk 텍스트 또는 None (실패시)
+        """
+        return self._get_chunk_contents([(file_path, start_pos, end_pos)], timeout_ms=timeout_ms)[0]
+    
+    def _get_chunk_contents(self, ranges: List[tuple], timeout_ms: int = 5000) -> List[Optional[str]]:
+        """
+        여러 (file_path, start_pos, end_pos) 구간의 텍스트를 가져옵니다.
+        파일 전체가 이미 캐시에 있으면 캐시에서 잘라 쓰고, 나머지는 구간 요청을 연달아 보낸 뒤 한꺼번에 수신합니다.
+        
+        Returns:
+            ranges와 같은 순서의 chunk 텍스트 목록 (실패시 None)
+        """
+        texts = [None] * len(ranges)
+        missing = {}
+        now = time.monotonic()
+        for i, key in enumerate(ranges):
+            file_path, start_pos, end_pos = key
+            cached = self._file_cache.get(file_path)
+            if cached is not None and now - cached[0] < self._file_cache_ttl:
+                texts[i] = cached[1][start_pos:end_pos]
+            else:
+                missing.setdefault(key, []).append(i)
+        
+        if missing:
+            with self._socket_lock:
+                request_ids = [self.send_file_request(file_path, start_pos, end_pos)
+                               for file_path, start_pos, end_pos in missing]
+                responses = self.recv_file_responses(request_ids, timeout_ms=timeout_ms)
+            for indices, request_id in zip(missing.values(), request_ids):
+                content = responses.get(request_id)
+                for i in indices:
+                    texts[i] = content
+        
+        return texts
+    
+    def _cache_file_content(self, file_path: str, content: str):
+        """파일 내용을 캐시에 넣고, 최대 크기를 넘으면 가장 오래된 항목부터 제거합니다."""
+        old = self._file_cache.pop(file_path, None)
+        if old is not None:
+            self._file_cache_bytes -= len(old[1])
+        if len(content) > self._file_cache_max_bytes:
+            return
+        
+        self._file_cache[file_path] = (time.monotonic(), content)
+        self._file_cache_bytes += len(content)
+        while self._file_cache_bytes > self._file_cache_max_bytes:
+            _, (_, evicted) = self._file_cache.popitem(last=False)
+            self._file_cache_bytes -= len(evicted)
+    
+    def send_file_request(self, file_path: str, start_pos: Optional[int] = None, end_pos: Optional[int] = None) -> str:
+        """
+        응답을 기다리지 않고 파일 요청을 전송합니다.
+        
+        Args:
+            file_path: 요청할 파일의 경로
+            start_pos, end_pos: 지정하면 파일 전체 대신 해당 구간의 텍스트만 요청
             
-            # 요청 전송
-            self.socket.send_json(request)
+        Returns:
+            응답을 구분하기 위한 request_id
+        """
+        request_id = uuid.uuid4().hex
+        logger.debug("📄 파일 요청: %s", file_path)
+        
+        # 요청 메시지 구성 (REP 서버와 통신하므로 빈 delimiter 프레임을 앞에 붙임)
+        request = {"request_id": request_id, "file_path": file_path}
+        if start_pos is not None or end_pos is not None:
+            request["start_pos"] = start_pos
+            request["end_pos"] = end_pos
+        self.socket.send_multipart([b'', msgpack.packb(request, use_bin_type=True)])
+        return request_id
+    
+    def recv_file_responses(self, request_ids: List[str], timeout_ms: int = 5000) -> Dict[str, Optional[str]]:
+        """
+        전송해 둔 파일 요청들의 응답을 도착하는 순서대로 받아 request_id별로 정리합니다.
+        
+        Args:
+            request_ids: send_file_request가 반환한 request_id 목록
+            timeout_ms: 전체 응답 대기 시간 (밀리초, 기본값: 5초)
             
-            # 응답 대기 (타임아웃 설정)
-            if self.socket.poll(timeout=timeout_ms):
-                response = self.socket.recv_json()
+        Returns:
+            {request_id: 파일의 텍스트 내용 또는 None (실패/타임아웃시)}
+        """
+        pending = set(request_ids)
+        contents = {}
+        poller = zmq.Poller()
+        poller.register(self.socket, zmq.POLLIN)
+        deadline = time.monotonic() + timeout_ms / 1000
+        
+        try:
+            while pending:
+                remaining_ms = int((deadline - time.monotonic()) * 1000)
+                if remaining_ms <= 0 or not poller.poll(remaining_ms):
+                    break
                 
-                # 응답 처리
-                if isinstance(response, dict) and response.get("status") == "success":
-                    content = response.get("content")
-                    content_length = response.get("content_length", 0)
-                    print(f"✅ 파일 내용 수신 완료: {content_length} 문자")
-                    return str(content) if content is not None else None
-                elif isinstance(response, dict):
-                    error_msg = response.get("error", "알 수 없는 오류")
-                    print(f"❌ 파일 요청 실패: {error_msg}")
-                    return None
-                else:
-                    print(f"❌ 잘못된 응답 형식: {response}")
-                    return None
-            else:
-                print(f"⏰ 응답 타임아웃: {file_path}")
-                return None
+                frames = self.socket.recv_multipart()
+                response = msgpack.unpackb(frames[-1], raw=False)
+                request_id = response.get("request_id") if isinstance(response, dict) else None
+                if request_id not in pending:
+                    # 이전에 타임아웃된 요청의 늦은 응답은 버림
+                    continue
+                
+                pending.discard(request_id)
+                contents[request_id] = self._parse_file_response(response)
                 
         except Exception as e:
-            print(f"❌ 파일 요청 중 오류: {e}")
-            return None
+            logger.warning("❌ 파일 요청 중 오류: %s", e)
+        
+        for request_id in pending:
+            logger.warning("⏰ 응답 타임아웃: %s", request_id)
+            contents[request_id] = None
+        return contents
+    
+    def _parse_file_response(self, response: Dict[str, Any]) -> Optional[str]:
+        """파일 요청 응답에서 텍스트 내용을 꺼냅니다."""
+        if response.get("status") == "success":
+            content = response.get("content")
+            content_length = response.get("content_length", 0)
+            logger.debug("✅ 파일 내용 수신 완료: %d 문자", content_length)
+            return content
+        
+        error_msg = response.get("error", "알 수 없는 오류")
+        logger.warning("❌ 파일 요청 실패: %s", error_msg)
+        return None
     
     def close(self):
         """연결을 종료합니다."""
+        self._executor.shutdown(wait=False)
+        # 공유 컨텍스트이므로 term()하지 않고 소켓만 닫는다
         self.socket.close()
-        self.context.term()
-        print("🔌 FileRetriever 연결 종료됨")
+        logger.info("🔌 FileRetriever 연결 종료됨")
+    
+    def _get_query_embeddings(self, queries: List[str]) -> Optional[List[List[float]]]:
+        """
+        여러 query 문장의 embedding을 생성합니다.
+        캐시에 있는 query는 재사용하고, 나머지만 한 번의 배치 호출로 생성합니다.
+        """
+        Embedding, embedding_model_name = _load_embedding()
+        keys = [(embedding_model_name, hashlib.blake2b(query.encode('utf-8'), digest_size=16).hexdigest())
+                for query in queries]
+        
+        results = [None] * len(queries)
+        missing = []
+        for i, key in enumerate(keys):
+            cached = self._emb_cache.get(key)
+            if cached is not None:
+                self._emb_cache.move_to_end(key)
+                results[i] = cached
+            else:
+                missing.append(i)
+        
+        if missing:
+            try:
+                embeddings = Embedding([queries[i] for i in missing])
+                if not embeddings or len(embeddings) != len(missing):
+                    return None
+            except Exception as e:
+                logger.warning("❌ Query embedding 생성 실패: %s", e)
+                return None
+            
+            for i, embedding in zip(missing, embeddings):
+                # 저장된 벡터와 같이 unit-norm으로 맞춰 유사도를 내적 한 번으로 계산
+                results[i] = normalize(embedding)
+                self._emb_cache[keys[i]] = results[i]
+                if len(self._emb_cache) > self._emb_cache_max:
+                    self._emb_cache.popitem(last=False)
+        
+        return results
     
     def _get_query_embedding(self, query: str) -> Optional[List[float]]:
         """query 문장의 embedding을 생성합니다."""
-        try:
-            embeddings = Embedding(query)
-            # Embedding() 함수는 리스트의 리스트를 반환하므로 첫 번째 요소만 가져옴
-            return embeddings[0] if embeddings and len(embeddings) > 0 else None
-        except Exception as e:
-            print(f"❌ Query embedding 생성 실패: {e}")
-            return None
+        embeddings = self._get_query_embeddings([query])
+        return embeddings[0] if embeddings else None
     
-    def _search_similar_chunks(self, query_embedding: List[float], n_results: int = 10, pathlist=None) -> List[Dict]:
-        """db.py를 사용하여 유사한 chunk들을 검색합니다."""
+    def _search_similar_chunks(self, query_embeddings: List[List[float]], n_results: int = 10, pathlist=None) -> List[List[Dict]]:
+        """db.py를 사용하여 query별로 유사한 chunk들을 한 번에 검색합니다."""
         try:
-            results = search_data(query_embedding, n_results=n_results, pathlist=pathlist)
+            batch_results = search_data_batch(query_embeddings, n_results=n_results, pathlist=pathlist)
             
-            chunks = []
-            for i, (file_path, start_idx, end_idx) in enumerate(results):
-                chunks.append({
-                    'file_path': file_path,
-                    'start_pos': start_idx,  # start_idx를 start_pos로 매핑
-                    'end_pos': end_idx,      # end_idx를 end_pos로 매핑
-                    'distance': 0  # db.py에서는 distance 정보를 제공하지 않음
-                })
+            # start_idx/end_idx를 start_pos/end_pos로 매핑
+            batch_chunks = [
+                [{'file_path': file_path, 'start_pos': start_idx, 'end_pos': end_idx, 'distance': distance}
+                 for file_path, start_idx, end_idx, distance in results]
+                for results in batch_results
+            ]
             
-            print(f"🔍 db.py 검색 완료: {len(chunks)}개 chunk 발견")
-            return chunks
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🔍 db.py 검색 완료: %d개 query, %d개 chunk 발견", len(batch_chunks), sum(len(c) for c in batch_chunks))
+            return batch_chunks
             
         except Exception as e:
-            print(f"❌ db.py 검색 실패: {e}")
-            return []
+            logger.warning("❌ db.py 검색 실패: %s", e)
+            return [[] for _ in query_embeddings]
     
-    def _extract_chunk_text(self, file_path: str, start_pos: int, end_pos: int) -> Optional[str]:
-        """파일에서 특정 위치의 chunk 원문을 추출합니다."""
-        try:
-            file_content = self.get_file_content(file_path)
-            if file_content:
-                return file_content[start_pos:end_pos]
-            return None
-        except Exception as e:
-            print(f"❌ Chunk 추출 실패 ({file_path}): {e}")
-            return None
+    def _search_similar_chunks_cached(self, queries: List[str], query_embeddings: List[List[float]],
+                                      n_results: int, pathlist: List[str]) -> List[List[Dict]]:
+        """
+        캐시된 ANN 결과가 있으면 잘라서 재사용하고, 없는 query만 ChromaDB에서 검색합니다.
+        검색은 n_results 이상인 가장 작은 2의 거듭제곱 개수로 수행해 캐시에 저장합니다.
+        """
+        bucket = 1 << max(0, n_results - 1).bit_length()
+        pathlist_key = hash(frozenset(pathlist))
+        now = time.monotonic()
+        
+        results = [None] * len(queries)
+        missing = []
+        for i, query in enumerate(queries):
+            key = (hashlib.blake2b(query.encode('utf-8'), digest_size=16).hexdigest(), pathlist_key)
+            cached = self._ann_cache.get(key)
+            if cached is not None and now - cached[0] < self._ann_cache_ttl and cached[1] >= n_results:
+                self._ann_cache.move_to_end(key)
+                results[i] = cached[2][:n_results]
+            else:
+                missing.append((i, key))
+        
+        if missing:
+            batch_chunks = self._search_similar_chunks([query_embeddings[i] for i, _ in missing],
+                                                       n_results=bucket, pathlist=pathlist)
+            for (i, key), chunks in zip(missing, batch_chunks):
+                results[i] = chunks[:n_results]
+                if not chunks:
+                    # 검색 실패와 구분할 수 없으므로 빈 결과는 캐시하지 않음
+                    continue
+                self._ann_cache[key] = (now, bucket, chunks)
+                if len(self._ann_cache) > self._ann_cache_max:
+                    self._ann_cache.popitem(last=False)
+        
+        return results
     
     def search_chunks(self, query: str, top_n: int = 5) -> List[Dict[str, str]]:
         """
@@ -197,73 +452,114 @@ class FileRetriever:
         Returns:
             상위 n개 chunk 정보들의 리스트 (각 항목은 {'text': chunk 원문, 'file_name': 파일명} 형태)
         """
+        results = self.search_chunks_batch([query], top_n=top_n)
+        return results[0] if results else []
+    
+    def search_chunks_batch(self, queries: List[str], top_n: int = 5) -> List[List[Dict[str, str]]]:
+        """
+        여러 query(query 확장, 하위 질문 등)를 한 번에 검색합니다.
+        embedding 생성과 ChromaDB 검색은 각각 한 번의 배치 호출로 처리하고,
+        reranking은 query별로 수행합니다.
+        
+        Args:
+            queries: 검색할 query 문장 목록
+            top_n: query별로 반환할 상위 chunk 개수
+            
+        Returns:
+            queries와 같은 순서의 검색 결과 리스트 (각 항목은 search_chunks의 반환값과 같은 형태)
+        """
+        if not queries:
+            return []
+        
         try:
-            print(f"🔍 검색 시작: '{query}'")
+            logger.debug("🔍 검색 시작: %s", queries)
             
-            # 1. Query embedding 생성
-            query_embedding = self._get_query_embedding(query)
-            if not query_embedding:
-                return []
+            # 1. 사용자 권한 조회(Oracle 왕복)를 백그라운드로 보내고, 그동안 query embedding 생성
+            pathlist_future = self._executor.submit(self._get_user_accessible_files, self.user_id)
+            query_embeddings = self._get_query_embeddings(queries)
+            if not query_embeddings:
+                return [[] for _ in queries]
             
             # 2. 사용자 권한에 따른 pathlist 생성
-            pathlist = self._get_user_accessible_files(self.user_id)
+            pathlist = pathlist_future.result()
             if not pathlist:
-                print(f"❌ DB 접근 권한이 없습니다. 사용자: {self.user_id}")
-                return []
-            print(f"� 권한 필터링: {len(pathlist)}개 파일에 대해서만 검색")
+                logger.warning("❌ DB 접근 권한이 없습니다. 사용자: %s", self.user_id)
+                return [[] for _ in queries]
+            logger.debug("🔒 권한 필터링: %d개 파일에 대해서만 검색", len(pathlist))
             
-            # 3. ChromaDB에서 유사한 chunk들 검색
-            similar_chunks = self._search_similar_chunks(query_embedding, n_results=top_n*2, pathlist=pathlist)
-            if not similar_chunks:
-                return [{'text': '검색된 문서가 없습니다', 'file_name': ''}]
+            # 3. ChromaDB에서 유사한 chunk들 검색 (캐시에 없는 query만 한 번에)
+            # top_n == 1이면 reranking 없이 ANN 1위를 그대로 사용하므로 후보를 더 가져오지 않음
+            n_results = 1 if top_n == 1 else top_n * self.ann_overfetch
+            batch_chunks = self._search_similar_chunks_cached(queries, query_embeddings, n_results, pathlist)
             
-            # 4. 각 chunk의 원문과 파일명 추출
-            chunk_data = []
-            for chunk in similar_chunks:
-                chunk_text = self._extract_chunk_text(
-                    chunk['file_path'], 
-                    chunk['start_pos'], 
-                    chunk['end_pos']
-                )
-                if chunk_text:
-                    import os
-                    file_name = os.path.basename(chunk['file_path'])
-                    chunk_data.append({
-                        'text': chunk_text,
-                        'file_name': file_name,
-                        'file_path': chunk['file_path']  # reranking을 위해 임시 저장
-                    })
+            if top_n == 1:
+                return self._best_chunks(batch_chunks)
             
-            if not chunk_data:
-                return []
-            
-            # 5. Reranking으로 상위 n개 선별
-            try:
-                # reranking을 위해 텍스트만 추출
-                chunk_texts = [item['text'] for item in chunk_data]
-                reranked_chunks = Reranker(query, chunk_texts, top_n=top_n)['results']
-                
-                # reranking 결과를 바탕으로 원본 chunk_data에서 해당하는 항목들을 찾아서 반환
-                result_chunks = []
-                for reranked_chunk in reranked_chunks:
-                    reranked_text = reranked_chunk['document']
-                    # 원본 chunk_data에서 해당 텍스트를 찾기
-                    for chunk_item in chunk_data:
-                        if chunk_item['text'] == reranked_text:
-                            result_chunks.append({
-                                'text': chunk_item['text'],
-                                'file_name': chunk_item['file_name']
-                            })
-                            break
-                
-                print(f"✅ 검색 완료: {len(result_chunks)}개 chunk 반환")
-                return result_chunks
-            except Exception as e:
-                print(f"⚠️ Reranking 실패, 원본 순서로 반환: {e}")
-                # reranking 실패시 원본 순서로 반환 (file_path 제거)
-                return [{'text': item['text'], 'file_name': item['file_name']} for item in chunk_data[:top_n]]
+            return [self._rerank_chunks(query, similar_chunks, top_n)
+                    for query, similar_chunks in zip(queries, batch_chunks)]
                 
         except Exception as e:
-            print(f"❌ 검색 중 오류: {e}")
+            logger.warning("❌ 검색 중 오류: %s", e)
+            return [[] for _ in queries]
+    
+    def _best_chunks(self, batch_chunks: List[List[Dict]]) -> List[List[Dict[str, str]]]:
+        """query별 ANN 1위 chunk만 (한 번에 요청해서) 반환합니다. reranking은 하지 않습니다."""
+        top_chunks = [similar_chunks[0] for similar_chunks in batch_chunks if similar_chunks]
+        texts = iter(self._fetch_chunk_texts(top_chunks))
+        
+        results = []
+        for similar_chunks in batch_chunks:
+            if not similar_chunks:
+                results.append([{'text': '검색된 문서가 없습니다', 'file_name': ''}])
+                continue
+            chunk_text = next(texts)
+            if chunk_text:
+                results.append([{'text': chunk_text, 'file_name': os.path.basename(similar_chunks[0]['file_path'])}])
+            else:
+                results.append([])
+        return results
+    
+    def _fetch_chunk_texts(self, similar_chunks: List[Dict]) -> List[Optional[str]]:
+        """
+        chunk 구간만 요청해서 (요청은 연달아 보내고 응답은 한꺼번에 수신)
+        similar_chunks와 같은 순서로 chunk 원문을 반환합니다. 파일 전체는 전송되지 않습니다.
+        """
+        ranges = [(chunk['file_path'], chunk['start_pos'], chunk['end_pos']) for chunk in similar_chunks]
+        return self._get_chunk_contents(ranges)
+    
+    def _rerank_chunks(self, query: str, similar_chunks: List[Dict], top_n: int) -> List[Dict[str, str]]:
+        """검색된 chunk들의 원문을 가져와 reranking하여 상위 n개를 반환합니다."""
+        if not similar_chunks:
+            return [{'text': '검색된 문서가 없습니다', 'file_name': ''}]
+        
+        # 4. 각 chunk의 원문 추출 (서버에서 잘라 보낸 구간 텍스트가 similar_chunks 순서의 슬롯에 채워짐)
+        chunk_texts = self._fetch_chunk_texts(similar_chunks)
+        
+        # 원문을 받지 못한 슬롯은 제외하고, 텍스트 목록을 그대로 reranker 입력으로 사용
+        chunk_texts_ok = []
+        file_names = []
+        for chunk, chunk_text in zip(similar_chunks, chunk_texts):
+            if chunk_text:
+                chunk_texts_ok.append(chunk_text)
+                file_names.append(os.path.basename(chunk['file_path']))
+        
+        if not chunk_texts_ok:
             return []
-
+        
+        # 5. Reranking으로 상위 n개 선별
+        try:
+            # 검색 순서 그대로 보내서 점수가 같으면 검색 순위가 높은 chunk가 앞에 오게 함, 결과는 index로 매핑
+            reranked_chunks = _load_reranker()(query, chunk_texts_ok, top_n=top_n)['results']
+            
+            result_chunks = []
+            for reranked_chunk in reranked_chunks:
+                i = reranked_chunk['index']
+                result_chunks.append({'text': chunk_texts_ok[i], 'file_name': file_names[i]})
+            
+            logger.debug("✅ 검색 완료: %d개 chunk 반환", len(result_chunks))
+            return result_chunks
+        except Exception as e:
+            logger.warning("⚠️ Reranking 실패, 원본 순서로 반환: %s", e)
+            # reranking 실패시 원본 순서로 반환
+            return [{'text': chunk_text, 'file_name': file_name}
+                    for chunk_text, file_name in zip(chunk_texts_ok[:top_n], file_names)]
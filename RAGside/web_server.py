@@ -6,6 +6,7 @@ RAGAgent Web Server
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
 import json
+import logging
 from agent import RAGAgent
 
 app = Flask(__name__)
@@ -106,6 +107,8 @@ def health_check():
     })
 
 if __name__ == '__main__':
+    # retriever 등 라이브러리 모듈은 logging을 사용 (기본 WARNING, 상세 로그는 DEBUG로 변경)
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
     try:
         print("🚀 RAGAgent API Server 시작...")
         print("📡 API 서버 주소: http://localhost:5000")
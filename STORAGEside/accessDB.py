@@ -1,54 +1,80 @@
-# Dummy Authorization Metadata DB
-class DummyAuthDB:
-    def __init__(self):
-        # Users table
-        self.users = {
-            "guest": {"role": "guest"},
-            "user1": {"role": "employee"},
-            "user2": {"role": "employee"}, 
-            "admin": {"role": "admin"}
-        }
+import os
+import sys
+import json
+import logging
+from collections import defaultdict
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "configs", "auth.json")
 
-        # 폴더별 파일 구조
-        self.folder_structure = {
-            "confidential": [
+logger = logging.getLogger(__name__)
 
-            ],
-            "project1": [
 
-            ],
-            "project2": [
+# Dummy Authorization Metadata DB
+class DummyAuthDB:
+    __slots__ = (
+        "users", "folder_structure", "folder_permissions", "folder_liked_users",
+        "_folder_users", "_user_paths", "_user_paths_tuple"
+    )
 
-            ],
-            "company_events": [
+    def __init__(self, users: dict, folder_structure: dict, folder_permissions: dict, folder_liked_users: dict):
+        # 사용자 ID / 폴더명은 여러 테이블과 경로 목록에 반복해서 나오므로 intern해서 같은 문자열 객체를 공유
+        intern = sys.intern
 
-            ],
-            "company_important_notice": [
+        # Users table
+        self.users = {intern(user_id): info for user_id, info in users.items()}
 
-            ],
-            "company_promotion": [
-    
-            ]
-        }
+        # 폴더별 파일 구조 (파일 추가/삭제시 수정되므로 복사해서 보관)
+        self.folder_structure = {intern(folder): list(files) for folder, files in folder_structure.items()}
 
         # 사용자별 폴더 접근 권한
         self.folder_permissions = {
-            "guest": ["company_events","company_important_notice","company_promotion"],
-            "user1": ["project1", "company_events","company_important_notice","company_promotion"],
-            "user2": ["project2", "company_events","company_important_notice","company_promotion"],
-            "admin": ["confidential", "project1", "project2", "company_events","company_important_notice","company_promotion"]
+            intern(user_id): tuple(intern(folder) for folder in folders)
+            for user_id, folders in folder_permissions.items()
         }
 
         # 폴더별 좋아요 누른 사용자 목록
         self.folder_liked_users = {
-            "confidential": ["admin"],
-            "project1": ["user1", "admin"],
-            "project2": ["user2", "admin"],
-            "company_events": ["guest", "user2", "admin"],
-            "company_important_notice": ["user1", "user2", "admin"],
-            "company_promotion": ["guest", "user1","admin"]
+            intern(folder): tuple(intern(user_id) for user_id in user_ids)
+            for folder, user_ids in folder_liked_users.items()
         }
 
+        # 사용자별 접근 가능 경로를 미리 계산 (get_authorized_paths 호출마다 폴더를 다시 훑지 않도록)
+        self._build_user_paths()
+
+    @classmethod
+    def from_config(cls, path: str = DEFAULT_CONFIG_PATH):
+        """
+        Load users / folders / permissions from a JSON config file.
+
+        Args:
+            path (str): Path of the JSON config (default: configs/auth.json)
+
+        Returns:
+            DummyAuthDB: A DB populated with the config data.
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(
+            users=config.get("users", {}),
+            folder_structure=config.get("folder_structure", {}),
+            folder_permissions=config.get("folder_permissions", {}),
+            folder_liked_users=config.get("folder_liked_users", {})
+        )
+
+    def _build_user_paths(self):
+        """folder_permissions / folder_structure로부터 사용자별 경로 목록과 폴더별 사용자 목록을 계산"""
+        self._folder_users = defaultdict(list)
+        self._user_paths = {}
+        self._user_paths_tuple = {}
+        for user_id, allowed_folders in self.folder_permissions.items():
+            for folder in allowed_folders:
+                self._folder_users[folder].append(user_id)
+            self._user_paths[user_id] = [
+                sys.intern(f"{folder}/{filename}")
+                for folder in allowed_folders
+                for filename in self.folder_structure.get(folder, [])
+            ]
+
     def get_authorized_paths(self, user_id: str):
         """
         Retrieve the list of authorized paths for a given user.
@@ -57,22 +83,16 @@ class DummyAuthDB:
             user_id (str): The ID of the user.
 
         Returns:
-            list: A list of paths the user is authorized to access.
+            tuple: The paths the user is authorized to access.
         """
-        authorized_paths = []
-        
-        # 사용자의 접근 가능한 폴더 목록 가져오기
-        allowed_folders = self.folder_permissions.get(user_id, [])
-        
-        # 각 허용된 폴더의 파일들을 경로에 추가
-        for folder in allowed_folders:
-            if folder in self.folder_structure:
-                for filename in self.folder_structure[folder]:
-                    # 폴더/파일명 형태로 전체 경로 생성
-                    full_path = f"{folder}/{filename}"
-                    authorized_paths.append(full_path)
-        
-        return authorized_paths
+        # 불변 스냅샷(tuple)은 조회할 때 만들고, 파일 추가/삭제시에는 버리기만 함
+        # (파일을 하나 추가할 때마다 전체 경로 목록을 다시 복사하지 않음)
+        paths = self._user_paths_tuple.get(user_id)
+        if paths is None:
+            if user_id not in self._user_paths:
+                return ()
+            paths = self._user_paths_tuple[user_id] = tuple(self._user_paths[user_id])
+        return paths
 
     def add_file_to_folder(self, folder_name: str, filename: str):
         """
@@ -85,11 +105,15 @@ class DummyAuthDB:
         if folder_name in self.folder_structure:
             if filename not in self.folder_structure[folder_name]:
                 self.folder_structure[folder_name].append(filename)
-                print(f"[+] Added file '{filename}' to folder '{folder_name}'")
+                full_path = sys.intern(f"{folder_name}/{filename}")
+                for user_id in self._folder_users.get(folder_name, []):
+                    self._user_paths[user_id].append(full_path)
+                    self._user_paths_tuple.pop(user_id, None)
+                logger.debug("[+] Added file '%s' to folder '%s'", filename, folder_name)
             else:
-                print(f"[!] File '{filename}' already exists in folder '{folder_name}'")
+                logger.debug("[!] File '%s' already exists in folder '%s'", filename, folder_name)
         else:
-            print(f"[x] Folder '{folder_name}' not found in folder structure")
+            logger.warning("[x] Folder '%s' not found in folder structure", folder_name)
 
     def remove_file_from_folder(self, folder_name: str, filename: str):
         """
@@ -102,11 +126,15 @@ class DummyAuthDB:
         if folder_name in self.folder_structure:
             if filename in self.folder_structure[folder_name]:
                 self.folder_structure[folder_name].remove(filename)
-                print(f"[-] Removed file '{filename}' from folder '{folder_name}'")
+                full_path = f"{folder_name}/{filename}"
+                for user_id in self._folder_users.get(folder_name, []):
+                    self._user_paths[user_id].remove(full_path)
+                    self._user_paths_tuple.pop(user_id, None)
+                logger.debug("[-] Removed file '%s' from folder '%s'", filename, folder_name)
             else:
-                print(f"[!] File '{filename}' not found in folder '{folder_name}'")
+                logger.debug("[!] File '%s' not found in folder '%s'", filename, folder_name)
         else:
-            print(f"[x] Folder '{folder_name}' not found in folder structure")
+            logger.warning("[x] Folder '%s' not found in folder structure", folder_name)
 
     def update_file_structure(self, file_path: str, operation: str):
         """
@@ -121,7 +149,7 @@ class DummyAuthDB:
             if '/' in file_path:
                 folder_name, filename = file_path.split('/', 1)
             else:
-                print(f"[!] Invalid file path format: {file_path}. Expected 'folder/filename'")
+                logger.warning("[!] Invalid file path format: %s. Expected 'folder/filename'", file_path)
                 return
             
             if operation == 'create':
@@ -129,10 +157,10 @@ class DummyAuthDB:
             elif operation == 'delete':
                 self.remove_file_from_folder(folder_name, filename)
             else:
-                print(f"[!] Unknown operation: {operation}. Use 'create' or 'delete'")
+                logger.warning("[!] Unknown operation: %s. Use 'create' or 'delete'", operation)
                 
         except Exception as e:
-            print(f"[x] Error updating file structure: {e}")
+            logger.warning("[x] Error updating file structure: %s", e)
 
     def get_folder_liked_users(self, folder_name: str):
         """
@@ -142,6 +170,6 @@ class DummyAuthDB:
             folder_name (str): 폴더명
             
         Returns:
-            list: 해당 폴더에 좋아요를 누른 사용자 목록
+            tuple: 해당 폴더에 좋아요를 누른 사용자 목록
         """
-        return self.folder_liked_users.get(folder_name, [])
+        return self.folder_liked_users.get(folder_name, ())
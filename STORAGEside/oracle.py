@@ -5,345 +5,1110 @@
 - 파일 요청 처리 HTTP 서버
 """
 
+import io
 import os
+import re
+import sys
 import time
 import getpass
+import signal
 import threading
-import json
-import base64
+import hashlib
+import queue
+import logging
+import logging.handlers
 from pathlib import Path
+from dataclasses import dataclass
+from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import zmq
+import msgspec
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler
-import git
-from git import Repo, InvalidGitRepositoryError
+from watchdog.observers.polling import PollingObserver
+if sys.platform.startswith('linux'):
+    from watchdog.observers.inotify import InotifyObserver
+else:
+    InotifyObserver = None
+from watchdog.events import PatternMatchingEventHandler
+from watchdog.utils.patterns import match_any_paths
+import pygit2
+from pygit2.enums import FileStatus, RepositoryOpenFlag
 from accessDB import DummyAuthDB
 
+logger = logging.getLogger(__name__)
+
+# 파일 내용 해시 (no-op 저장 감지용): blake3가 있으면 사용 (SIMD로 훨씬 빠름), 없으면 blake2b
+try:
+    from blake3 import blake3 as _blake3
+    
+    def _content_digest(data):
+        return _blake3(data).digest()
+except ImportError:
+    def _content_digest(data):
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+# JSON 인코딩/디코딩은 msgspec 사용 (Struct는 필드 배치가 고정되어 dict 없이 한 번에 bytes로 인코딩됨)
+_dumps = msgspec.json.Encoder().encode
+_loads = msgspec.json.decode
+
+# ROUTER 파일 요청/응답 헤더는 msgpack (파일 내용은 계속 별도 bytes 프레임)
+# 이전 JSON 헤더와 호환되지 않으므로 file_preprocessor도 같은 형식을 사용해야 함
+_pack = msgspec.msgpack.Encoder().encode
+_unpack = msgspec.msgpack.decode
+
+
+class SendMessage(msgspec.Struct, omit_defaults=True):
+    """file_preprocessor로 보내는 파일 변경 알림 헤더 (기본값인 필드는 전송하지 않음)"""
+    event_type: str
+    user_id: str
+    file_path: str
+    timestamp: float
+    liked_users: tuple = ()
+    git_committed: bool = False
+    file_size: Optional[int] = None
+    fetch_hint: Optional[str] = None
+    diff_type: Optional[str] = None
+    relative_path: Optional[str] = None
+    diff_hash: Optional[str] = None
+    diff_unchanged: bool = False
+    diff_ranges: Optional[list] = None
+    diff_content: Optional[str] = None
+
+
+# ROUTER 파일 요청 프로토콜 버전 (file_preprocessor의 WATCHER_FILE_PROTOCOL_VERSION과 같아야 함)
+# 요청: [msgpack {'file_path': ...}]
+# 응답: [msgpack FileResponse 헤더, 파일 내용 bytes] (실패시 헤더 프레임만)
+FILE_PROTOCOL_VERSION = 2
+
+
+# tag_field로 지정한 version은 omit_defaults와 상관없이 항상 헤더에 포함됨
+class FileResponse(msgspec.Struct, omit_defaults=True, tag_field='version', tag=FILE_PROTOCOL_VERSION):
+    """ROUTER 파일 요청에 대한 응답 헤더 (파일 내용은 다음 프레임으로 전송)"""
+    status: str
+    file_path: Optional[str] = None
+    file_size: int = 0
+    file_name: Optional[str] = None
+    error: Optional[str] = None
+
+
+# 같은 호스트의 file_preprocessor와는 POSIX에서 Unix 도메인 소켓(ipc)으로 통신 (TCP loopback보다 빠름)
+# Windows는 ipc를 지원하지 않으므로 127.0.0.1 TCP 사용
+IPC_AVAILABLE = os.name != 'nt'
+PUSH_IPC_ENDPOINT = "ipc:///tmp/db_sorcerer_push.sock"
+ROUTER_IPC_ENDPOINT = "ipc:///tmp/db_sorcerer_router.sock"
+
+# ROUTER로 들어온 파일 요청을 worker 스레드들에게 나눠주는 내부(inproc) 주소
+FILE_WORKERS_ENDPOINT = "inproc://file_request_workers"
+# 서버 루프를 깨워 종료시키는 PAIR 주소, worker들에게 종료를 알리는 PUB 주소
+SERVER_CONTROL_ENDPOINT = "inproc://server_loop_control"
+WORKER_SHUTDOWN_ENDPOINT = "inproc://file_request_shutdown"
+
+# unified diff hunk 헤더 (@@ -a,b +c,d @@)에서 새 파일 기준 시작 줄/줄 수 추출
+HUNK_HEADER_PATTERN = re.compile(r'^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@', re.MULTILINE)
+
+# 텍스트 diff가 의미 없는 바이너리 문서 형식 (새 파일은 내용 대신 해시만 기록)
+BINARY_EXTENSIONS = ('.docx', '.pdf', '.hwp')
+
+# inotify 이벤트가 오지 않는 네트워크/원격 파일 시스템 (이 경우 주기적으로 폴더를 훑는 polling 사용)
+NETWORK_FS_TYPES = frozenset({'nfs', 'nfs4', 'cifs', 'smb3', 'smbfs', '9p', 'fuse.sshfs', 'afs', 'ceph', 'glusterfs'})
+
+
+def _mount_fstype(path):
+    """/proc/self/mountinfo에서 path가 속한 마운트의 파일 시스템 종류를 찾음 (Linux 외에는 None)"""
+    try:
+        with open('/proc/self/mountinfo', encoding='utf-8') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    
+    path = os.path.realpath(path)
+    best_mount, best_fstype = '', None
+    for line in lines:
+        # 형식: ID 부모ID major:minor root 마운트지점 옵션 [선택 필드...] - 종류 장치 옵션
+        fields, _, rest = line.partition(' - ')
+        fields = fields.split()
+        if len(fields) < 5 or not rest:
+            continue
+        mount_point = fields[4].replace('\\040', ' ')
+        prefix = mount_point.rstrip('/') + '/'
+        if (path == mount_point or path.startswith(prefix)) and len(mount_point) > len(best_mount):
+            best_mount, best_fstype = mount_point, rest.split()[0]
+    return best_fstype
+
+
+# 감시에서 제외할 경로 패턴: Git 내부 파일, 오피스/편집기가 저장 중에 만드는 임시 파일 (~$문서.docx 등)
+# (*.tmp, *.swp 등은 대상 확장자 패턴에 걸리지 않으므로 따로 적지 않음)
+WATCH_IGNORE_PATTERNS = ['*/.git/*', '~$*', '.~lock.*']
+
+
+def setup_logging(level=logging.INFO):
+    """
+    로그를 QueueHandler로 큐에 넣고, 별도 QueueListener 스레드가 stdout에 출력하도록 설정
+    이벤트 처리 스레드는 stdout 쓰기를 기다리지 않음. 반환된 listener는 종료시 stop() 호출
+    """
+    log_queue = queue.Queue(-1)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    
+    root = logging.getLogger()
+    root.handlers[:] = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level)
+    listener.start()
+    return listener
+
+
+@dataclass(slots=True)
+class FileEvent:
+    """감시 이벤트 하나에 대해 한 번만 계산한 경로/stat 정보"""
+    abs_path: str
+    rel_path: str
+    st: Optional[os.stat_result]  # 파일이 없으면 None
+
 
 class FileWatcher:
-    def __init__(self, watch_folder, push_port=5555, router_port=5556, access_port=5559):
+    def __init__(self, watch_folder, push_port=5555, router_port=5556, access_port=5559,
+                 max_file_size=100 * 1024 * 1024, sndhwm=16, rcvhwm=16, linger=0, immediate=True,
+                 push_endpoint=None, router_workers=4, diff_only_updates=True,
+                 event_workers=4, event_queue_size=256, poll_interval=30.0,
+                 oob_threshold=5 * 1024 * 1024, commit_window=2.0, commit_max_batch=16,
+                 upload_rate_per_file=2 * 1024 * 1024, upload_burst=10.0):
         self.watch_folder = Path(watch_folder)
         self.push_port = push_port
         self.router_port = router_port
+        # push_endpoint를 지정하지 않으면 POSIX는 ipc, Windows는 tcp://127.0.0.1:push_port
+        self.push_endpoint = push_endpoint or (PUSH_IPC_ENDPOINT if IPC_AVAILABLE else f"tcp://127.0.0.1:{push_port}")
         self.access_port = access_port
+        self.max_file_size = max_file_size  # 이보다 큰 파일은 전송하지 않음 (bytes)
+        # 이보다 큰 바이너리 문서는 Git blob으로 저장하지 않고 메타데이터만 커밋 (내용은 .oob/objects에 복사)
+        self.oob_threshold = oob_threshold
+        self.oob_dir = self.watch_folder / ".oob"
+        # True면 작은 수정(diff가 파일 크기의 절반 미만)은 diff만 보내고 파일 내용은 ROUTER로 요청하게 함
+        self.diff_only_updates = diff_only_updates
         self.user_id = getpass.getuser()
         
-        # ZeroMQ context 생성
-        self.context = zmq.Context()
+        # ZeroMQ context 생성 (큰 파일 전송이 한 I/O 스레드에 몰리지 않도록 I/O 스레드를 늘림)
+        self.context = zmq.Context(io_threads=max(2, (os.cpu_count() or 2) // 2))
+        self.router_workers = router_workers  # 파일 요청을 처리할 worker 스레드 수
+        
+        # 소켓 공통 옵션
+        # 메시지 하나가 수 MB 파일일 수 있으므로 HWM을 작게 잡아 대기열 메모리를 제한하고,
+        # LINGER 0으로 종료시 보내지 못한 메시지 때문에 context.term()이 멈추지 않게 함
+        # (SNDBUF/RCVBUF는 커널 기본값 유지)
+        socket_options = {zmq.SNDHWM: sndhwm, zmq.RCVHWM: rcvhwm, zmq.LINGER: linger}
         
         # PUSH 소켓 (파일 변경사항 전송용)
-        self.push_socket = self.context.socket(zmq.PUSH)
-        self.push_socket.bind(f"tcp://localhost:{self.push_port}")
+        # IMMEDIATE: 연결이 완료된 peer에게만 메시지를 대기시킴
+        self.push_socket = self._create_socket(zmq.PUSH, socket_options, {zmq.IMMEDIATE: int(immediate)})
+        self.push_socket.bind(self.push_endpoint)
         
         # ROUTER 소켓 (파일 요청 처리용)
-        self.router_socket = self.context.socket(zmq.ROUTER)
+        self.router_socket = self._create_socket(zmq.ROUTER, socket_options)
+        # 원격 클라이언트용 tcp와 함께, 같은 호스트 클라이언트용 ipc에도 bind
         self.router_socket.bind(f"tcp://*:{self.router_port}")
+        if IPC_AVAILABLE:
+            self.router_socket.bind(ROUTER_IPC_ENDPOINT)
         
         # REP 소켓 (access 함수 처리용)
-        self.rep_socket = self.context.socket(zmq.REP)
+        self.rep_socket = self._create_socket(zmq.REP, socket_options)
         self.rep_socket.bind(f"tcp://*:{self.access_port}")
         
         # 감시 대상 파일 확장자
-        self.allowed_extensions = {'.docx', '.pdf', '.hwp', '.txt'}
+        self.allowed_extensions = frozenset({'.docx', '.pdf', '.hwp', '.txt'})
+        # str.endswith에 바로 넘길 수 있는 tuple (C에서 접미사들을 한 번에 비교)
+        self._allowed_suffixes = tuple(sorted(self.allowed_extensions))
         
-        # Observer 설정
-        self.observer = Observer()
+        # Observer 설정 (로컬 파일 시스템은 inotify, 네트워크 파일 시스템은 poll_interval초 간격 polling)
+        self.poll_interval = poll_interval
+        self.observer = self._create_observer()
         
         # Git 저장소 설정
+        # pygit2 Repository/Index는 스레드 안전하지 않으므로 diff(I/O 스레드)와 커밋(커밋 스레드)의 접근을 잠금으로 직렬화
         self.repo = None
+        self._repo_lock = threading.Lock()
         self._init_git_repo()
         
-        # Router 처리를 위한 스레드 플래그
-        self.router_running = False
-        self.access_running = False
+        # git diff 결과 LRU 캐시 ((상대경로, mtime_ns, 크기, diff 기준 id) -> diff 정보)
+        # 저장 한 번에 on_modified가 여러 번 와도 내용이 같으면 git diff를 다시 실행하지 않음
+        self._diff_cache = OrderedDict()
+        self._diff_cache_max = 256
+        # I/O 스레드의 조회/추가와 event worker의 무효화가 동시에 일어나므로 잠금으로 보호
+        self._diff_cache_lock = threading.Lock()
+        
+        # 경로별로 마지막으로 전송한 diff의 해시 (같은 diff는 다시 보내지 않음)
+        self._diff_hash_by_path = {}
+        
+        # 텍스트 파일별로 마지막으로 전송한 내용의 blob id (diff 기준)
+        # HEAD와 비교하면 commit_window 안의 연속 수정이 누적 diff로 중복 전송되므로 직전 전송본과 비교
+        self._sent_blob = {}
+        
+        # 경로별로 마지막으로 전송한 파일 내용의 해시 (내용이 그대로인 저장은 diff/커밋/전송 모두 생략)
+        self._content_hash = {}
+        
+        # Git 커밋 큐 (이벤트 처리 스레드는 넣기만 하고, 커밋 스레드가 모아서 한 번에 커밋)
+        self._commit_queue = queue.Queue()
+        self._commit_thread = None
+        self.commit_window = commit_window  # 첫 이벤트 이후 이 시간(초) 동안 들어온 변경사항을 한 커밋으로 묶음
+        self.commit_max_batch = commit_max_batch  # 이만큼 파일이 모이면 commit_window를 기다리지 않고 바로 커밋
+        
+        # 감시 이벤트 처리 큐 (watchdog 스레드는 큐에 넣기만 하고, event worker 스레드들이 전송)
+        # 같은 경로의 이벤트는 항상 같은 큐로 가므로 경로별 순서(create -> update -> delete)가 유지됨
+        # 큐가 가득 차면 watchdog 스레드가 대기하므로 메모리는 event_queue_size로 제한됨
+        self._event_queues = [queue.Queue(maxsize=event_queue_size) for _ in range(max(1, event_workers))]
+        self._event_threads = []
+        # PUSH 소켓은 스레드 안전하지 않으므로 여러 event worker의 전송을 잠금으로 직렬화
+        self._push_lock = threading.Lock()
+        
+        # 파일별 업로드 속도 제한 (token bucket, 상대경로 -> (토큰 bytes, 마지막 갱신 시각))
+        # 자동 저장되는 큰 파일이 매번 전체 업로드되어 업링크를 독차지하지 않도록 파일당 평균 upload_rate_per_file bytes/s로 제한
+        # 버킷 용량은 upload_burst초 분량이고, 용량보다 큰 파일도 보낼 수 있도록 토큰이 음수(빚)가 되는 것을 허용
+        # None이면 제한하지 않음
+        self.upload_rate_per_file = upload_rate_per_file
+        self.upload_burst = upload_burst
+        self._upload_buckets = {}
+        # 속도 제한으로 미뤄진 전송 (상대경로 -> (Timer, 파일 경로, 이벤트 타입)), 같은 파일은 마지막 이벤트 하나만 유지
+        self._deferred_sends = {}
+        self._throttle_lock = threading.Lock()
+        
+        # git diff 계산용 I/O 스레드 (diff를 계산하는 동안 이벤트 스레드는 커밋 요청/파일 읽기를 진행)
+        self._io_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="oracle-io")
+        
+        # 서버 루프/worker 종료 신호
+        self._shutdown_event = threading.Event()
+        # 메인 스레드 대기 해제 신호 (SIGINT/SIGTERM 또는 stop() 호출)
+        self._stop_event = threading.Event()
 
-        self.auth_db = DummyAuthDB()
+        self.auth_db = DummyAuthDB.from_config()
+        
+        # auth_db 조회 결과 TTL 캐시 (key -> (조회 시각, 결과))
+        # 같은 폴더에서 저장이 몰려도 좋아요 사용자 / 접근 경로 조회는 auth_cache_ttl 동안 한 번만 수행
+        self.auth_cache_ttl = 10.0
+        self._liked_cache = {}
+        self._paths_cache = {}
+        
+    def _get_liked(self, folder_name):
+        """폴더에 좋아요를 누른 사용자 목록 (TTL 캐시)"""
+        now = time.monotonic()
+        cached = self._liked_cache.get(folder_name)
+        if cached is not None and now - cached[0] < self.auth_cache_ttl:
+            return cached[1]
+        try:
+            liked_users = self.auth_db.get_folder_liked_users(folder_name)
+        except Exception:
+            self._liked_cache.pop(folder_name, None)
+            raise
+        self._liked_cache[folder_name] = (now, liked_users)
+        return liked_users
+    
+    def _update_file_structure(self, rel_path, operation):
+        """auth_db의 파일 구조를 갱신하고, 그에 따라 달라지는 접근 경로 캐시를 비움"""
+        self.auth_db.update_file_structure(rel_path, operation)
+        self._paths_cache.clear()
+    
+    def _create_observer(self):
+        """감시 폴더가 있는 파일 시스템에 맞는 watchdog Observer 생성"""
+        if InotifyObserver is None:
+            # Linux 외 플랫폼은 watchdog 기본값 (Windows: ReadDirectoryChangesW, macOS: FSEvents)
+            return Observer()
         
+        fstype = _mount_fstype(self.watch_folder)
+        if fstype in NETWORK_FS_TYPES:
+            logger.info("🌐 네트워크 파일 시스템(%s) 감지: %.0f초 간격 polling으로 감시", fstype, self.poll_interval)
+            return PollingObserver(timeout=self.poll_interval)
+        return InotifyObserver()
+    
+    def _create_socket(self, socket_type, *option_sets):
+        """옵션을 적용한 ZeroMQ 소켓 생성"""
+        sock = self.context.socket(socket_type)
+        for options in option_sets:
+            for option, value in options.items():
+                sock.setsockopt(option, value)
+        return sock
+    
     def _init_git_repo(self):
         """Git 저장소 초기화"""
         try:
             # 폴더 생성 (Git 초기화 전에 필요)
             self.watch_folder.mkdir(exist_ok=True)
             
-            # 기존 Git 저장소인지 확인
+            # 기존 Git 저장소인지 확인 (상위 폴더의 저장소는 찾지 않음)
             try:
-                self.repo = Repo(str(self.watch_folder))
-                print(f"✅ 기존 Git 저장소 연결: {self.watch_folder}")
-            except InvalidGitRepositoryError:
+                self.repo = pygit2.Repository(str(self.watch_folder), RepositoryOpenFlag.NO_SEARCH)
+                logger.info("✅ 기존 Git 저장소 연결: %s", self.watch_folder)
+            except pygit2.GitError:
                 # Git 저장소가 아닌 경우 새로 초기화
-                self.repo = Repo.init(str(self.watch_folder))
-                print(f"🆕 새 Git 저장소 초기화: {self.watch_folder}")
+                self.repo = pygit2.init_repository(str(self.watch_folder))
+                logger.info("🆕 새 Git 저장소 초기화: %s", self.watch_folder)
                 
                 # 초기 커밋 생성 (gitignore 추가)
                 gitignore_path = self.watch_folder / ".gitignore"
                 with open(gitignore_path, 'w', encoding='utf-8') as f:
-                    f.write("# 임시 파일\n*.tmp\n*.swp\n*.swo\n")
+                    f.write("# 임시 파일\n*.tmp\n*.swp\n*.swo\n# 큰 파일 원본 (메타데이터만 커밋)\n.oob/objects/\n")
                 
-                self.repo.index.add([".gitignore"])
-                self.repo.index.commit(f"Initial commit by {self.user_id}")
+                self.repo.index.add(".gitignore")
+                self.repo.index.write()
+                tree = self.repo.index.write_tree()
+                signature = self._signature()
+                self.repo.create_commit('HEAD', signature, signature, f"Initial commit by {self.user_id}", tree, [])
+            
+            self._configure_git_repo()
                 
         except Exception as e:
-            print(f"❌ Git 저장소 초기화 실패: {e}")
+            logger.error("❌ Git 저장소 초기화 실패: %s", e)
             self.repo = None
     
+    def _configure_git_repo(self):
+        """
+        파일이 많은 감시 폴더에서 git CLI(git status 등)가 빠르게 동작하도록 저장소 설정 (이미 설정된 값은 유지)
+        watcher 자신은 libgit2로 변경된 경로만 확인하므로 이 설정과 무관함
+        core.fsmonitor는 저장소마다 daemon을 띄우므로 사용하지 않음 (변경 감지는 watcher가 이미 하고 있음)
+        """
+        config = self.repo.config
+        for key, value in (('feature.manyFiles', 'true'),    # index v4 (경로 압축) + 추가 최적화
+                           ('core.untrackedCache', 'true')):  # 추적되지 않은 파일 목록 캐시
+            if key not in config:
+                config[key] = value
+    
+    def _signature(self):
+        """커밋 작성자 정보 (git config의 user.name/email이 없으면 로컬 사용자 이름 사용)"""
+        try:
+            return self.repo.default_signature
+        except (KeyError, pygit2.GitError):
+            return pygit2.Signature(self.user_id, f"{self.user_id}@localhost")
+    
+    @staticmethod
+    def _git_path(rel_path):
+        """OS 경로를 Git 내부 경로 형식('/' 구분)으로 변환"""
+        return rel_path.replace(os.sep, '/')
+    
     def _is_target_file(self, file_path):
         """감시 대상 파일인지 확인"""
-        _, ext = os.path.splitext(file_path)
-        return ext.lower() in self.allowed_extensions
+        return file_path.lower().endswith(self._allowed_suffixes)
+    
+    def _file_event(self, file_path):
+        """이벤트 경로의 상대 경로와 stat 결과를 한 번에 계산"""
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            st = None
+        return FileEvent(abs_path=file_path, rel_path=os.path.relpath(file_path, self.watch_folder), st=st)
     
-    def _get_file_diff(self, file_path):
+    def _read_file_bytes(self, file_path, file_size=None):
+        """
+        파일 내용을 bytes로 읽기 (base64 없이 ZeroMQ 프레임으로 그대로 전송)
+        
+        Args:
+            file_path: 파일 경로
+            file_size: 이미 stat한 파일 크기 (없으면 새로 조회)
+        
+        Returns:
+            파일 내용 bytearray. max_file_size를 넘으면 ValueError
+        """
+        if file_size is None:
+            file_size = os.path.getsize(file_path)
+        if file_size > self.max_file_size:
+            raise ValueError(f"파일 크기 제한 초과: {file_size:,} bytes (최대 {self.max_file_size:,} bytes)")
+        
+        # 파일 크기만큼 버퍼를 한 번만 할당하고 버퍼링 없이 바로 채움 (중간 복사/재할당 없음)
+        buf = bytearray(file_size)
+        read = 0
+        with open(file_path, 'rb', buffering=0) as file, memoryview(buf) as view:
+            while read < file_size:
+                n = file.readinto(view[read:])
+                if not n:
+                    break
+                read += n
+        if read < file_size:
+            # stat 이후 파일이 줄어든 경우
+            del buf[read:]
+        return buf
+    
+    def _get_file_diff(self, ev):
         """파일의 Git diff 정보를 가져오기"""
-        if not self.repo:
+        if not self.repo or ev.st is None:
             return None
             
         try:
-            # 파일 경로를 상대 경로로 변환
-            rel_path = os.path.relpath(file_path, self.watch_folder)
+            # 기준(직전 전송본 또는 HEAD)이 바뀌면 같은 파일 상태라도 diff가 달라지므로 기준 id도 키에 포함
+            base_id = self._sent_blob.get(ev.rel_path)
+            if base_id is None:
+                with self._repo_lock:
+                    base_id = None if self.repo.head_is_unborn else self.repo.head.target
+            cache_key = (ev.rel_path, ev.st.st_mtime_ns, ev.st.st_size, base_id)
+            with self._diff_cache_lock:
+                if cache_key in self._diff_cache:
+                    self._diff_cache.move_to_end(cache_key)
+                    return self._diff_cache[cache_key]
             
-            # 스테이징된 파일과 현재 파일의 차이점 확인
-            try:
-                # HEAD와 현재 작업 디렉터리의 차이점
-                diff = self.repo.git.diff('HEAD', rel_path)
-                if diff:
-                    return {
-                        'type': 'modification',
-                        'diff': diff,
-                        'file_path': rel_path
-                    }
-                
-                # 새 파일인지 확인 (아직 추적되지 않은 파일)
-                untracked_files = self.repo.untracked_files
-                if rel_path in untracked_files:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        content = f.read()
-                    return {
-                        'type': 'new_file',
-                        'diff': f"--- /dev/null\n+++ b/{rel_path}\n" + 
-                               "\n".join([f"+{line}" for line in content.split('\n')]),
-                        'file_path': rel_path
-                    }
-                        
-            except Exception as e:
-                print(f"⚠️ diff 생성 중 오류: {e}")
-                return None
+            diff_info = self._compute_file_diff(ev.abs_path, ev.rel_path)
+            with self._diff_cache_lock:
+                self._diff_cache[cache_key] = diff_info
+                if len(self._diff_cache) > self._diff_cache_max:
+                    self._diff_cache.popitem(last=False)
+            return diff_info
                 
         except Exception as e:
-            print(f"❌ Git diff 처리 실패: {e}")
+            logger.warning("❌ Git diff 처리 실패: %s", e)
+            return None
+    
+    @staticmethod
+    def _diff_ranges(diff):
+        """diff의 hunk 헤더로부터 변경된 줄 범위 [(시작, 끝), ...]를 계산 (새 파일 기준, 1부터 시작)"""
+        ranges = []
+        for match in HUNK_HEADER_PATTERN.finditer(diff):
+            start = int(match.group(1))
+            length = int(match.group(2)) if match.group(2) is not None else 1
+            # 줄이 삭제만 된 hunk(length 0)는 해당 위치 한 줄로 표시
+            ranges.append((start, start + max(length, 1) - 1))
+        return ranges
+    
+    def _invalidate_diff_cache(self, rel_path):
+        """해당 파일의 캐시된 diff와 diff 기준을 모두 제거"""
+        self._diff_hash_by_path.pop(rel_path, None)
+        self._sent_blob.pop(rel_path, None)
+        with self._diff_cache_lock:
+            for key in [key for key in self._diff_cache if key[0] == rel_path]:
+                del self._diff_cache[key]
+    
+    def _compute_file_diff(self, file_path, rel_path):
+        """git diff를 실행해 diff 정보를 생성 (변경사항이 없으면 None, 실패시 예외)"""
+        git_path = self._git_path(rel_path)
+        
+        is_binary = file_path.lower().endswith(BINARY_EXTENSIONS)
+        
+        # 기준 blob(텍스트는 직전 전송본, 없으면 HEAD)과 현재 파일 내용만 비교 (작업 디렉터리 전체를 diff하지 않음)
+        # 저장소 객체는 잠금 안에서만 사용하고, 파일 읽기/해시는 잠금 밖에서 수행
+        base_id = None if is_binary else self._sent_blob.get(rel_path)
+        entry = None
+        if base_id is None:
+            with self._repo_lock:
+                if not self.repo.head_is_unborn:
+                    try:
+                        entry = self.repo.head.peel(pygit2.Tree)[git_path]
+                    except KeyError:
+                        pass
+        
+        if entry is not None and is_binary:
+            # pdf/docx/hwp는 압축된 바이너리라 텍스트 diff가 의미 없음
+            # 파일을 메모리로 읽지 않고 libgit2에서 blob id만 계산해 HEAD와 비교
+            blob_id = pygit2.hashfile(file_path)
+            if blob_id == entry.id:
+                return None
+            return {
+                'type': 'binary',
+                'diff': f"--- a/{rel_path}\n+++ b/{rel_path}\nBinary file modified (blob {blob_id})\n",
+                'file_path': rel_path
+            }
+        if entry is not None:
+            base_id = entry.id
+        if base_id is not None:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            with self._repo_lock:
+                patch = pygit2.Patch.create_from(self.repo[base_id], data,
+                                                 old_as_path=git_path, new_as_path=git_path)
+                diff = patch.text
+            if diff:
+                return {
+                    'type': 'modification',
+                    'diff': diff,
+                    'file_path': rel_path
+                }
+            # 기준과 내용이 같으면 새 파일도 아님
             return None
+
+        # OOB로 커밋된 큰 바이너리는 HEAD/index에 원본이 없으므로 커밋된 메타데이터와 비교
+        # (내용이 바뀌었는지는 전송 전에 이미 확인했으므로 여기서 다시 해시하지 않음)
+        if file_path.lower().endswith(BINARY_EXTENSIONS):
+            meta = self._read_oob_meta(rel_path)
+            if meta is not None:
+                st = os.stat(file_path)
+                if st.st_size == meta['size'] and st.st_mtime_ns == meta['mtime_ns']:
+                    return None
+                return {
+                    'type': 'binary',
+                    'diff': (f"--- a/{rel_path}\n+++ b/{rel_path}\nBinary file modified "
+                             f"(size {meta['size']} -> {st.st_size}, mtime_ns {st.st_mtime_ns})\n"),
+                    'file_path': rel_path
+                }
+
+        with self._repo_lock:
+            # 인덱스에 있으면 (커밋 대기 중인 파일 등) 추적 중이므로 status 확인 없이 종료
+            if git_path in self.repo.index:
+                return None
+            
+            # 새 파일인지 확인 (아직 추적되지 않은 파일)
+            try:
+                untracked = bool(self.repo.status_file(git_path) & FileStatus.WT_NEW)
+            except KeyError:
+                untracked = False
+        if untracked:
+            if file_path.lower().endswith(BINARY_EXTENSIONS):
+                # 바이너리 문서는 줄 단위 diff 대신 내용 해시만 기록
+                with open(file_path, 'rb') as f:
+                    digest = hashlib.file_digest(f, 'sha256').hexdigest()
+                return {
+                    'type': 'binary_new',
+                    'diff': f"--- /dev/null\n+++ b/{rel_path}\nBinary file added (sha256 {digest})\n",
+                    'file_path': rel_path,
+                    'sha256': digest
+                }
+            
+            # 텍스트 파일은 한 줄씩 읽으며 바로 버퍼에 씀 (전체 내용/줄 목록을 따로 만들지 않음)
+            buf = io.StringIO()
+            buf.write(f"--- /dev/null\n+++ b/{rel_path}\n")
+            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+                for line in f:
+                    buf.write('+')
+                    buf.write(line)
+            return {
+                'type': 'new_file',
+                'diff': buf.getvalue(),
+                'file_path': rel_path
+            }
         
         return None
     
-    def _commit_file_change(self, file_path, event_type):
-        """파일 변경사항을 Git에 커밋"""
+    def _commit_file_change(self, ev, event_type):
+        """
+        파일 변경사항을 Git 커밋 큐에 추가 (커밋은 _commit_worker가 모아서 수행)
+        
+        Returns:
+            커밋 대기열에 추가되었으면 True
+        """
         if not self.repo:
             return False
+        
+        self._commit_queue.put((ev.rel_path, event_type))
+        return True
+    
+    def _commit_worker(self):
+        """
+        커밋 큐의 변경사항을 commit_window 동안 (또는 commit_max_batch개가 모일 때까지) 모아서 한 번에 커밋
+        None을 받으면 남은 것을 커밋하고 종료
+        """
+        running = True
+        while running:
+            item = self._commit_queue.get()
+            if item is None:
+                break
+            
+            # 같은 파일의 이벤트는 마지막 것만 남김
+            pending = {item[0]: item[1]}
+            deadline = time.monotonic() + self.commit_window
+            while len(pending) < self.commit_max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._commit_queue.get(timeout=min(0.2, remaining))
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                pending[item[0]] = item[1]
             
+            self._commit_batch(pending)
+    
+    def _commit_batch(self, pending):
+        """{상대경로: 이벤트 타입}을 하나의 Git 커밋으로 기록"""
+        # index 갱신부터 커밋까지 diff 계산과 겹치지 않도록 저장소 잠금을 잡고 수행
+        with self._repo_lock:
+            self._commit_batch_locked(pending)
+    
+    def _commit_batch_locked(self, pending):
+        """_commit_batch 본체 (_repo_lock을 잡은 상태에서 호출)"""
         try:
-            rel_path = os.path.relpath(file_path, self.watch_folder)
+            index = self.repo.index
+            index.read()
             
-            if event_type == 'delete':
-                # 파일 삭제의 경우
-                try:
-                    self.repo.index.remove([rel_path])
-                    commit_msg = f"Delete {rel_path} by {self.user_id}"
-                    self.repo.index.commit(commit_msg)
-                    print(f"📝 Git 커밋: {commit_msg}")
-                    return True
-                except Exception as e:
-                    print(f"⚠️ 삭제 커밋 실패: {e}")
-                    return False
+            added = []
+            removed = []
+            oob_changed = False
+            for rel_path, event_type in pending.items():
+                full_path = self.watch_folder / rel_path
+                if event_type == 'delete':
+                    try:
+                        had_meta = self._remove_oob_meta(index, rel_path)
+                        oob_changed |= had_meta
+                        if self._git_path(rel_path) in index:
+                            index.remove(self._git_path(rel_path))
+                        elif not had_meta:
+                            continue  # 추적되지 않던 파일
+                        removed.append(rel_path)
+                    except Exception as e:
+                        logger.warning("⚠️ 삭제 커밋 실패: %s (%s)", rel_path, e)
+                elif full_path.exists():
+                    if (full_path.stat().st_size > self.oob_threshold
+                            and rel_path.lower().endswith(BINARY_EXTENSIONS)):
+                        self._stage_oob(index, rel_path, full_path)
+                        oob_changed = True
+                    else:
+                        oob_changed |= self._remove_oob_meta(index, rel_path)
+                        index.add(self._git_path(rel_path))
+                    added.append(rel_path)
+            
+            changed = added + removed
+            if not changed:
+                return
+            index.write()
+            
+            verbs = {'create': 'Add', 'update': 'Update', 'delete': 'Delete'}
+            lines = [f"{verbs.get(pending[rel_path], 'Update')} {rel_path}" for rel_path in changed]
+            if len(lines) == 1:
+                commit_msg = f"{lines[0]} by {self.user_id}"
             else:
-                # 파일 생성/수정의 경우
-                if os.path.exists(file_path):
-                    self.repo.index.add([rel_path])
-                    
-                    if event_type == 'create':
-                        commit_msg = f"Add {rel_path} by {self.user_id}"
-                    else:  # update
-                        commit_msg = f"Update {rel_path} by {self.user_id}"
-                    
-                    self.repo.index.commit(commit_msg)
-                    print(f"📝 Git 커밋: {commit_msg}")
-                    return True
-                    
+                commit_msg = f"Update {len(lines)} files by {self.user_id}\n\n" + "\n".join(lines)
+            
+            tree = index.write_tree()
+            parents = [] if self.repo.head_is_unborn else [self.repo.head.target]
+            signature = self._signature()
+            self.repo.create_commit('HEAD', signature, signature, commit_msg, tree, parents)
+            logger.info("📝 Git 커밋: %s", commit_msg.partition("\n")[0])
+            if oob_changed:
+                self._gc_oob_objects()
+            
         except Exception as e:
-            print(f"❌ Git 커밋 실패: {e}")
+            logger.error("❌ Git 커밋 실패: %s", e)
+    
+    def _oob_meta_path(self, rel_path):
+        return self.oob_dir / "meta" / f"{rel_path}.meta"
+    
+    def _read_oob_meta(self, rel_path):
+        """파일의 OOB 메타데이터를 읽음 (없으면 None)"""
+        try:
+            return _loads(self._oob_meta_path(rel_path).read_bytes())
+        except FileNotFoundError:
+            return None
+    
+    def _stage_oob(self, index, rel_path, full_path):
+        """
+        큰 바이너리 파일은 Git에 내용을 저장하는 대신 메타데이터(크기/mtime/mode/sha256)만 커밋하고,
+        내용은 .oob/objects/<sha256>에 복사본으로 보관 (Git이 파일 전체를 압축해 object로 쓰지 않음)
+        복사하면서 sha256을 함께 계산해 파일을 한 번만 읽음
+        """
+        st = full_path.stat()
+        objects_dir = self.oob_dir / "objects"
+        objects_dir.mkdir(parents=True, exist_ok=True)
+        
+        # 임시 파일에 복사한 뒤 내용 해시 이름으로 rename (중간에 실패해도 깨진 보관본이 남지 않음)
+        tmp_path = objects_dir / f".tmp-{threading.get_ident()}"
+        sha = hashlib.sha256()
+        try:
+            with open(full_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+                while chunk := src.read(1024 * 1024):
+                    sha.update(chunk)
+                    dst.write(chunk)
+            digest = sha.hexdigest()
+            os.replace(tmp_path, objects_dir / digest)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+        
+        meta_path = self._oob_meta_path(rel_path)
+        meta_path.parent.mkdir(parents=True, exist_ok=True)
+        # diff 스레드가 잠금 없이 읽으므로 임시 파일에 쓰고 교체
+        tmp_meta_path = meta_path.with_name(meta_path.name + ".tmp")
+        tmp_meta_path.write_bytes(_dumps({
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'mode': st.st_mode,
+            'sha256': digest
+        }))
+        os.replace(tmp_meta_path, meta_path)
+        index.add(self._git_path(os.path.relpath(meta_path, self.watch_folder)))
+        # 이전에 원본 파일 자체가 추적되고 있었다면 index에서 제거
+        if self._git_path(rel_path) in index:
+            index.remove(self._git_path(rel_path))
+    
+    def _gc_oob_objects(self):
+        """현재 어떤 메타데이터도 가리키지 않는 .oob/objects 보관본을 삭제"""
+        objects_dir = self.oob_dir / "objects"
+        if not objects_dir.is_dir():
+            return
+        referenced = set()
+        for meta_path in (self.oob_dir / "meta").rglob("*.meta"):
+            try:
+                referenced.add(_loads(meta_path.read_bytes())['sha256'])
+            except (OSError, msgspec.DecodeError, KeyError) as e:
+                # 메타데이터를 읽을 수 없으면 어떤 보관본이 필요한지 모르므로 삭제하지 않음
+                logger.warning("⚠️ OOB 메타데이터 읽기 실패, 정리 건너뜀: %s (%s)", meta_path, e)
+                return
+        for object_path in objects_dir.iterdir():
+            if object_path.name not in referenced and not object_path.name.startswith(".tmp-"):
+                object_path.unlink(missing_ok=True)
+    
+    def _remove_oob_meta(self, index, rel_path):
+        """파일의 OOB 메타데이터가 있으면 index와 디스크에서 제거 (제거했으면 True)"""
+        meta_path = self._oob_meta_path(rel_path)
+        if not meta_path.exists():
+            return False
+        meta_git_path = self._git_path(os.path.relpath(meta_path, self.watch_folder))
+        if meta_git_path in index:
+            index.remove(meta_git_path)
+        meta_path.unlink()
+        return True
+    
+    def start_commit_worker(self):
+        """Git 커밋 스레드 시작"""
+        self._commit_thread = threading.Thread(target=self._commit_worker, daemon=True)
+        self._commit_thread.start()
+        return self._commit_thread
+    
+    def flush_commits(self):
+        """대기 중인 커밋을 모두 기록하고 커밋 스레드를 종료"""
+        if self._commit_thread and self._commit_thread.is_alive():
+            self._commit_queue.put(None)
+            self._commit_thread.join()
+    
+    def _enqueue_event(self, file_path, event_type):
+        """감시 이벤트를 경로에 해당하는 worker 큐에 넣음 (큐가 가득 차면 자리가 날 때까지 대기)"""
+        event_queue = self._event_queues[hash(file_path) % len(self._event_queues)]
+        event_queue.put((file_path, event_type))
+    
+    def _event_worker(self, event_queue):
+        """큐에서 감시 이벤트를 꺼내 전송 (None을 받으면 종료)"""
+        while True:
+            item = event_queue.get()
+            if item is None:
+                break
+            self._send_file(*item)
+    
+    def start_event_workers(self):
+        """감시 이벤트 처리 스레드 시작"""
+        self._event_threads = [
+            threading.Thread(target=self._event_worker, args=(event_queue,), daemon=True)
+            for event_queue in self._event_queues
+        ]
+        for event_thread in self._event_threads:
+            event_thread.start()
+    
+    def stop_event_workers(self):
+        """큐에 남은 이벤트를 모두 처리한 뒤 이벤트 처리 스레드 종료"""
+        for event_queue in self._event_queues:
+            event_queue.put(None)
+        for event_thread in self._event_threads:
+            event_thread.join()
+    
+    def _read_for_send(self, ev):
+        """생성/수정 이벤트로 보낼 파일 내용을 읽음 (실패하면 None)"""
+        try:
+            return self._read_file_bytes(ev.abs_path, ev.st.st_size)
+        except Exception as e:
+            logger.warning("⚠️ 파일 읽기 실패: %s", e)
+            return None
+    
+    def _throttle_send(self, ev, file_path, event_type):
+        """
+        파일별 token bucket을 확인해 지금 전송할 수 없으면 토큰이 찰 때까지 전송을 미룸
+        
+        Returns:
+            전송을 미뤘으면 True
+        """
+        rate = self.upload_rate_per_file
+        if not rate:
             return False
         
-        return False
+        rel_path = ev.rel_path
+        capacity = rate * self.upload_burst
+        now = time.monotonic()
+        with self._throttle_lock:
+            pending = self._deferred_sends.get(rel_path)
+            if pending is not None:
+                # 이미 예약된 재전송이 있으면 이벤트만 교체 (재전송 시점에 파일을 다시 읽으므로 최신 내용이 나감)
+                # 아직 보내지 못한 create 뒤의 update는 create로 유지
+                if pending[2] == 'create':
+                    event_type = 'create'
+                self._deferred_sends[rel_path] = (pending[0], file_path, event_type)
+                return True
+            
+            tokens, last = self._upload_buckets.get(rel_path, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            if tokens < 0:
+                self._upload_buckets[rel_path] = (tokens, now)
+                delay = -tokens / rate
+                timer = threading.Timer(delay, self._resend_deferred, args=(rel_path,))
+                timer.daemon = True
+                self._deferred_sends[rel_path] = (timer, file_path, event_type)
+                timer.start()
+                logger.info("⏳ 업로드 속도 제한, %.1f초 뒤 전송: %s", delay, rel_path)
+                return True
+            
+            self._upload_buckets[rel_path] = (tokens - ev.st.st_size, now)
+            return False
+    
+    def _resend_deferred(self, rel_path):
+        """속도 제한으로 미뤄진 이벤트를 다시 이벤트 큐에 넣음"""
+        with self._throttle_lock:
+            pending = self._deferred_sends.pop(rel_path, None)
+        if pending is not None:
+            self._enqueue_event(pending[1], pending[2])
+    
+    def flush_deferred_sends(self):
+        """미뤄진 전송을 속도 제한 없이 바로 이벤트 큐에 넣음 (종료시 변경사항 유실 방지)"""
+        self.upload_rate_per_file = None
+        with self._throttle_lock:
+            pending = list(self._deferred_sends.items())
+        for rel_path, (timer, _, _) in pending:
+            timer.cancel()
+            self._resend_deferred(rel_path)
     
     def _send_file(self, file_path, event_type):
         """파일을 서버로 전송"""
         try:
-            # 절대 경로를 상대 경로로 변환
-            rel_path = os.path.relpath(file_path, self.watch_folder)
-            
-            # 폴더명 추출하여 좋아요 사용자 정보 조회
-            folder_name = rel_path.split('/')[0] if '/' in rel_path else rel_path.split('\\')[0]
-            liked_users = self.auth_db.get_folder_liked_users(folder_name)
+            # 상대 경로와 stat 결과는 이벤트당 한 번만 계산해서 사용
+            ev = self._file_event(file_path)
+            rel_path = ev.rel_path
             
-            # Git diff 정보 수집 (update인 경우)
-            diff_info = None
-            if event_type == 'update':
-                diff_info = self._get_file_diff(file_path)
-            
-            # Git 커밋 수행
-            commit_success = self._commit_file_change(file_path, event_type)
-            
-            # 전송할 메시지 구성
-            message = {
-                'event_type': event_type,
-                'user_id': self.user_id,
-                'file_path': rel_path,
-                'liked_users': liked_users,
-                'git_committed': commit_success,
-                'timestamp': time.time()
-            }
+            # 파일이 없으면 생성/수정 이벤트는 전송하지 않음
+            if event_type != 'delete' and ev.st is None:
+                logger.warning("파일을 찾을 수 없습니다: %s", file_path)
+                return
             
+            file_bytes = None
+            digest = None
             if event_type == 'delete':
                 # 삭제 이벤트: 메타데이터만 전송
-                message['file_content'] = None
+                self._invalidate_diff_cache(rel_path)
+                self._content_hash.pop(rel_path, None)
+                self._upload_buckets.pop(rel_path, None)
             else:
-                # 생성/수정 이벤트: 파일 내용을 base64로 인코딩하여 전송
-                if os.path.exists(file_path):
-                    try:
-                        with open(file_path, 'rb') as file:
-                            file_content = file.read()
-                            message['file_content'] = base64.b64encode(file_content).decode('utf-8')
-                            message['file_size'] = len(file_content)
-                    except Exception as e:
-                        print(f"⚠️ 파일 읽기 실패: {e}")
-                        message['file_content'] = None
-                else:
-                    print(f"파일을 찾을 수 없습니다: {file_path}")
+                # 내용이 바뀌지 않은 저장(자동 저장 등)이면 속도 제한 토큰을 쓰기 전에 여기서 끝냄
+                # (해시는 전송에 성공한 뒤에 기록하므로 실패하거나 미뤄진 내용은 다음 이벤트에서 다시 보냄)
+                file_bytes = self._read_for_send(ev)
+                if file_bytes is not None:
+                    digest = _content_digest(file_bytes)
+                    if self._content_hash.get(rel_path) == digest:
+                        logger.debug("⏭️ 내용 변경 없음, 전송 생략: %s", rel_path)
+                        return
+                
+                # 파일별 업로드 속도 제한 (delete는 내용을 보내지 않으므로 제한하지 않음)
+                if self._throttle_send(ev, file_path, event_type):
                     return
             
-            # diff 정보가 있으면 추가
-            if diff_info:
-                message['diff_type'] = diff_info['type']
-                message['diff_content'] = diff_info['diff']
-                message['relative_path'] = diff_info['file_path']
+            # 폴더명 추출하여 좋아요 사용자 정보 조회
+            # (rel_path는 os.path.relpath 결과이므로 구분자는 항상 os.sep)
+            folder_name = rel_path.split(os.sep, 1)[0]
+            liked_users = self._get_liked(folder_name)
             
-            # ZeroMQ PUSH로 메시지 전송
-            self.push_socket.send_json(message)
+            # Git diff 정보 수집 (update인 경우, I/O 스레드에서 계산)
+            diff_future = self._io_pool.submit(self._get_file_diff, ev) if event_type == 'update' else None
+            
+            # 전송할 메시지 구성
+            # 메시지 형식: [JSON 헤더] 또는 [JSON 헤더, 파일 내용 bytes] (multipart)
+            message = SendMessage(
+                event_type=event_type,
+                user_id=self.user_id,
+                file_path=rel_path,
+                liked_users=liked_users,
+                timestamp=time.time()
+            )
+            if file_bytes is not None:
+                message.file_size = len(file_bytes)
             
-            # 상세한 전송 정보 출력
-            print(f"📤 [SEND -> file_preprocessor] 파일 전송 성공: {file_path}")
-            print(f"   📋 이벤트 타입: {event_type}")
-            print(f"   👤 사용자: {self.user_id}")
-            print(f"   📅 타임스탬프: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(message['timestamp']))}")
+            diff_info = diff_future.result() if diff_future is not None else None
             
-            if event_type != 'delete':
-                file_size = message.get('file_size', 0)
-                print(f"   📏 파일 크기: {file_size:,} bytes")
-                print(f"   🔒 Base64 인코딩: {'✅' if message.get('file_content') else '❌'}")
+            # Git 커밋 요청 (커밋 스레드가 비동기로 수행, commit_success는 대기열 추가 여부)
+            # HEAD가 바뀌기 전에 diff를 계산해야 하므로 diff 결과를 받은 뒤에 요청
+            commit_success = self._commit_file_change(ev, event_type)
+            message.git_committed = commit_success
             
-            print(f"   🌿 Git 커밋: {'✅' if commit_success else '❌'}")
+            sent_bytes = file_bytes
+            if (self.diff_only_updates and diff_info and diff_info['type'] == 'modification'
+                    and len(diff_info['diff']) < 0.5 * ev.st.st_size):
+                # 작은 수정: diff만 전송하고 파일 내용은 필요할 때 ROUTER 소켓으로 요청하도록 알림
+                message.file_size = ev.st.st_size
+                message.fetch_hint = 'router'
+                file_bytes = None
             
+            # diff 정보가 있으면 추가
             if diff_info:
-                print(f"   📊 Diff 정보: {diff_info['type']} ({len(diff_info['diff'])} chars)")
+                diff_hash = hashlib.blake2b(diff_info['diff'].encode('utf-8'), digest_size=16).hexdigest()
+                message.diff_type = diff_info['type']
+                message.relative_path = diff_info['file_path']
+                message.diff_hash = diff_hash
+                if self._diff_hash_by_path.get(rel_path) == diff_hash:
+                    # 직전에 보낸 diff와 같으면 diff 본문은 생략
+                    message.diff_unchanged = True
+                else:
+                    self._diff_hash_by_path[rel_path] = diff_hash
+                    message.diff_ranges = self._diff_ranges(diff_info['diff'])
+                    message.diff_content = diff_info['diff']
+            
+            # ZeroMQ PUSH로 메시지 전송
+            frames = [_dumps(message)]
+            if file_bytes is not None:
+                frames.append(file_bytes)
+            # copy=False: 파일 내용 버퍼를 복사하지 않고 그대로 ZeroMQ에 넘김
+            # (zmq.COPY_THRESHOLD보다 작은 헤더 프레임은 pyzmq가 알아서 복사)
+            with self._push_lock:
+                self.push_socket.send_multipart(frames, copy=False)
             
-            print(f"   🚀 전송 포트: tcp://localhost:{self.push_port}")
-            print("   " + "-" * 50)
+            if digest is not None:
+                self._content_hash[rel_path] = digest
+            if sent_bytes is not None and self.repo and not rel_path.lower().endswith(BINARY_EXTENSIONS):
+                # 다음 수정의 diff 기준으로 쓰도록 방금 보낸 내용을 blob으로 저장
+                with self._repo_lock:
+                    self._sent_blob[rel_path] = self.repo.create_blob(bytes(sent_bytes))
+            
+            logger.info("📤 [SEND -> file_preprocessor] %s %s", event_type, rel_path)
+            
+            # 상세한 전송 정보는 DEBUG 레벨에서만 문자열을 만듦
+            if logger.isEnabledFor(logging.DEBUG):
+                lines = [
+                    f"   📋 이벤트 타입: {event_type}",
+                    f"   👤 사용자: {self.user_id}",
+                    f"   📅 타임스탬프: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(message.timestamp))}",
+                ]
+                if event_type != 'delete':
+                    lines.append(f"   📏 파일 크기: {message.file_size or 0:,} bytes")
+                    if message.fetch_hint == 'router':
+                        lines.append("   📦 파일 내용 프레임: 생략 (ROUTER로 요청)")
+                    else:
+                        lines.append(f"   📦 파일 내용 프레임: {'✅' if file_bytes is not None else '❌'}")
+                lines.append(f"   🌿 Git 커밋: {'✅' if commit_success else '❌'}")
+                if diff_info:
+                    if message.diff_unchanged:
+                        lines.append(f"   📊 Diff 정보: {diff_info['type']} (이전 전송과 동일, 생략)")
+                    else:
+                        lines.append(f"   📊 Diff 정보: {diff_info['type']} ({len(diff_info['diff'])} chars, {len(message.diff_ranges)}개 hunk)")
+                lines.append(f"   🚀 전송 주소: {self.push_endpoint}")
+                logger.debug("\n".join(lines))
                 
         except Exception as e:
-            print(f"❌ 파일 전송 중 오류 발생: {e}")
+            logger.error("❌ 파일 전송 중 오류 발생: %s", e)
     
-    def _handle_file_request_router(self):
-        """ZeroMQ ROUTER 소켓으로 파일 요청 처리"""
-        self.router_running = True
-        print(f"🚀 파일 요청 서버 시작: tcp://*:{self.router_port}")
+    def _server_loop(self, backend_socket, control_socket):
+        """
+        ROUTER(frontend) <-> inproc DEALER(backend) 중계와 access REP 처리를 하나의 Poller로 수행
+        poll은 타임아웃 없이 대기하고, 종료시에는 control PAIR 소켓으로 깨움
+        """
+        logger.info("🚀 파일 요청 서버 시작: tcp://*:%s (worker %d개)", self.router_port, self.router_workers)
+        logger.info("🔑 access 서버 시작: tcp://*:%s", self.access_port)
         
-        while self.router_running:
-            try:
-                # 메시지 수신 (non-blocking with timeout)
-                if self.router_socket.poll(timeout=1000):  # 1초 타임아웃
-                    # [client_id, empty, request_message]
-                    client_id = self.router_socket.recv()
-                    empty = self.router_socket.recv()
-                    request_data = self.router_socket.recv_json()
+        poller = zmq.Poller()
+        for sock in (self.router_socket, backend_socket, self.rep_socket, control_socket):
+            poller.register(sock, zmq.POLLIN)
+        
+        try:
+            while not self._shutdown_event.is_set():
+                socks = dict(poller.poll())
+                
+                if control_socket in socks:
+                    control_socket.recv()
+                    break
+                
+                # 파일 요청은 worker들에게 전달하고, worker 응답은 요청자에게 돌려줌
+                if self.router_socket in socks:
+                    backend_socket.send_multipart(self.router_socket.recv_multipart())
+                if backend_socket in socks:
+                    self.router_socket.send_multipart(backend_socket.recv_multipart())
+                
+                # access 요청은 가벼우므로 루프에서 바로 처리
+                if self.rep_socket in socks:
+                    self._handle_access_request()
+        except zmq.ZMQError as e:
+            if not self._shutdown_event.is_set():
+                logger.error("❌ 서버 루프 오류: %s", e)
+        finally:
+            backend_socket.close()
+            control_socket.close()
+    
+    def _handle_file_request_worker(self):
+        """inproc REP 소켓으로 파일 요청을 받아 처리 (REP가 요청자 envelope를 자동으로 처리)"""
+        worker_socket = self._create_socket(zmq.REP, {zmq.LINGER: 0})
+        worker_socket.connect(FILE_WORKERS_ENDPOINT)
+        shutdown_socket = self._create_socket(zmq.SUB, {zmq.LINGER: 0, zmq.SUBSCRIBE: b''})
+        shutdown_socket.connect(WORKER_SHUTDOWN_ENDPOINT)
+        
+        poller = zmq.Poller()
+        poller.register(worker_socket, zmq.POLLIN)
+        poller.register(shutdown_socket, zmq.POLLIN)
+        
+        try:
+            while True:
+                try:
+                    socks = dict(poller.poll())
+                    if shutdown_socket in socks:
+                        break
                     
-                    print(f"📥 파일 요청 수신: {request_data}")
+                    request = worker_socket.recv()
                     
-                    # 응답 메시지 구성
-                    response = self._process_file_request(request_data)
+                    # REP 소켓은 recv 후 응답을 보내야 다음 요청을 받을 수 있으므로,
+                    # 요청 해석/처리에 실패해도 오류 응답을 보냄 (보내지 않으면 이 worker는 영구히 멈춤)
+                    try:
+                        request_data = _unpack(request)
+                        logger.debug("📥 파일 요청 수신: %s", request_data)
+                        
+                        # 응답 메시지 구성 (헤더, 파일 내용 bytes)
+                        response, file_bytes = self._process_file_request(request_data)
+                    except msgspec.DecodeError as e:
+                        # 이전 버전(JSON 요청) 클라이언트 등: version이 붙은 응답으로 프로토콜 불일치를 알림
+                        logger.debug("⚠️ 해석할 수 없는 파일 요청 형식: %s", e)
+                        response, file_bytes = FileResponse(status='error', error='unsupported request format'), None
+                    except Exception as e:
+                        response, file_bytes = FileResponse(status='error', error=str(e)), None
                     
-                    # 클라이언트에게 응답 전송
+                    # 응답 전송: [msgpack 헤더(, 파일 내용)]
                     try:
-                        response_json = json.dumps(response, ensure_ascii=False)
-                        self.router_socket.send_multipart([
-                            client_id,
-                            b'',
-                            response_json.encode('utf-8')
-                        ])
+                        frames = [_pack(response)]
+                        if file_bytes is not None:
+                            frames.append(file_bytes)
+                        worker_socket.send_multipart(frames, copy=False)
                     except Exception as json_error:
-                        print(f"❌ JSON 인코딩 오류: {json_error}")
+                        logger.error("❌ JSON 인코딩 오류: %s", json_error)
                         # 오류 응답 전송
-                        error_response = {
-                            'status': 'error',
-                            'error': f'JSON 인코딩 실패: {str(json_error)}'
-                        }
-                        self.router_socket.send_multipart([
-                            client_id,
-                            b'',
-                            json.dumps(error_response, ensure_ascii=False).encode('utf-8')
-                        ])
+                        error_response = FileResponse(status='error', error=f'JSON 인코딩 실패: {str(json_error)}')
+                        worker_socket.send(_pack(error_response))
                     
                     # 응답 전송 로그 출력
-                    if response.get('status') == 'success':
-                        file_name = response.get('file_name', 'Unknown')
-                        file_size = response.get('file_size', 0)
-                        print(f"📤 [RESPONSE -> {client_id.decode()[:8]}...] 파일 요청 응답 전송")
-                        print(f"   📄 파일명: {file_name}")
-                        print(f"   📏 파일 크기: {file_size:,} bytes")
-                        print(f"   🔒 Base64 인코딩: ✅")
-                        print(f"   🚀 응답 포트: tcp://*:{self.router_port}")
-                        print("   " + "-" * 50)
+                    if response.status == 'success':
+                        logger.debug("📤 [RESPONSE] 파일 요청 응답 전송: %s (%s bytes)", response.file_name, response.file_size)
                     else:
-                        error_msg = response.get('error', 'Unknown error')
-                        print(f"❌ [ERROR RESPONSE -> {client_id.decode()[:8]}...] 파일 요청 실패")
-                        print(f"   ⚠️ 오류: {error_msg}")
-                        print("   " + "-" * 50)
-                    
-            except Exception as e:
-                if self.router_running:  # 종료 중이 아닌 경우에만 에러 출력
-                    print(f"❌ 파일 요청 처리 중 오류: {e}")
+                        logger.warning("❌ [ERROR RESPONSE] 파일 요청 실패: %s", response.error)
+                        
+                except Exception as e:
+                    if self._shutdown_event.is_set():  # 종료 중이면 에러 출력 없이 종료
+                        break
+                    logger.error("❌ 파일 요청 처리 중 오류: %s", e)
+        finally:
+            worker_socket.close()
+            shutdown_socket.close()
     
-    def _handle_access_request_rep(self):
-        """ZeroMQ REP 소켓으로 access 요청 처리"""
-        self.access_running = True
-        print(f"🔑 access 서버 시작: tcp://*:{self.access_port}")
+    def _handle_access_request(self):
+        """access REP 소켓으로 들어온 요청 하나를 처리"""
+        try:
+            request = _loads(self.rep_socket.recv())
+            logger.debug("📥 access 요청 수신: %s", request)
+            
+            # access 함수 호출
+            user_id = request.get('user_id')
+            if user_id:
+                pathlist = self.access(user_id)
+                response = {'status': 'success', 'pathlist': pathlist}
+            else:
+                response = {'status': 'error', 'error': 'user_id가 필요합니다'}
+        except Exception as e:
+            logger.error("❌ access 요청 처리 중 오류: %s", e)
+            response = {'status': 'error', 'error': str(e)}
         
-        while self.access_running:
-            try:
-                # 메시지 수신 (non-blocking with timeout)
-                if self.rep_socket.poll(timeout=1000):  # 1초 타임아웃
-                    request = self.rep_socket.recv_json()
-                    print(f"📥 access 요청 수신: {request}")
-                    
-                    # access 함수 호출
-                    user_id = request.get('user_id')
-                    if user_id:
-                        pathlist = self.access(user_id)
-                        response = {'status': 'success', 'pathlist': pathlist}
-                    else:
-                        response = {'status': 'error', 'error': 'user_id가 필요합니다'}
-                    
-                    # 응답 전송
-                    self.rep_socket.send_json(response)
-                    print(f"📤 access 응답 전송: {len(pathlist) if user_id else 0}개 파일")
-                    
-            except Exception as e:
-                if self.access_running:  # 종료 중이 아닌 경우에만 에러 출력
-                    print(f"❌ access 요청 처리 중 오류: {e}")
+        # REP 소켓은 받은 요청마다 반드시 응답해야 함
+        self.rep_socket.send(_dumps(response))
+        logger.debug("📤 access 응답 전송: %s", response.get('status'))
 
     def _process_file_request(self, request_data):
-        """파일 요청 처리 로직"""
+        """
+        파일 요청 처리 로직
+        
+        Returns:
+            (응답 헤더 FileResponse, 파일 내용 bytes 또는 None) 튜플
+        """
         try:
             file_path = request_data.get('file_path')
             if not file_path:
-                return {'error': '파일 경로가 필요합니다', 'status': 'error'}
+                return FileResponse(status='error', error='파일 경로가 필요합니다'), None
             
             # 받은 경로를 Path 객체로 변환
             requested_path = Path(file_path)
@@ -354,37 +1119,34 @@ class FileWatcher:
                     requested_path = requested_path.relative_to(self.watch_folder)
                 except ValueError:
                     # watch_folder 밖의 파일은 접근 불가
-                    return {'error': 'watch_folder 외부 파일에는 접근할 수 없습니다', 'status': 'error'}
+                    return FileResponse(status='error', error='watch_folder 외부 파일에는 접근할 수 없습니다'), None
             
             # watch_folder 기준으로 절대 경로 생성
             full_path = self.watch_folder / requested_path
             
             # 파일 존재 확인
             if not full_path.exists():
-                print(f"❌ 파일을 찾을 수 없음: {full_path} (요청된 경로: {file_path})")
-                return {'error': '파일을 찾을 수 없습니다', 'status': 'error'}
+                logger.warning("❌ 파일을 찾을 수 없음: %s (요청된 경로: %s)", full_path, file_path)
+                return FileResponse(status='error', error='파일을 찾을 수 없습니다'), None
             
             # 대상 파일 확인
             if not self._is_target_file(str(full_path)):
-                return {'error': '지원하지 않는 파일 형식입니다', 'status': 'error'}
+                return FileResponse(status='error', error='지원하지 않는 파일 형식입니다'), None
             
-            # 파일 읽기 및 base64 인코딩
-            with open(full_path, 'rb') as file:
-                file_content = file.read()
-                encoded_content = base64.b64encode(file_content).decode('utf-8')
+            # 파일 읽기 (내용은 별도 프레임으로 전송)
+            file_bytes = self._read_file_bytes(full_path)
             
-            print(f"📤 파일 요청 처리 완료: {full_path} (상대경로: {requested_path})")
-            return {
-                'status': 'success',
-                'file_path': str(full_path),
-                'file_content': encoded_content,
-                'file_size': len(file_content),
-                'file_name': full_path.name
-            }
+            logger.debug("📤 파일 요청 처리 완료: %s (상대경로: %s)", full_path, requested_path)
+            return FileResponse(
+                status='success',
+                file_path=str(full_path),
+                file_size=len(file_bytes),
+                file_name=full_path.name
+            ), file_bytes
             
         except Exception as e:
-            print(f"❌ 파일 요청 처리 중 오류: {e}")
-            return {'error': str(e), 'status': 'error'}
+            logger.error("❌ 파일 요청 처리 중 오류: %s", e)
+            return FileResponse(status='error', error=str(e)), None
 
 
     def access(self, user_id: str) -> list:
@@ -398,118 +1160,228 @@ class FileWatcher:
             A list of file paths the user is authorized to access.
         """
         try:
+            now = time.monotonic()
+            cached = self._paths_cache.get(user_id)
+            if cached is not None and now - cached[0] < self.auth_cache_ttl:
+                return cached[1]
             authorized_paths = self.auth_db.get_authorized_paths(user_id)
-            print(f"🔑 Authorized paths for user {user_id}: {authorized_paths}")
+            self._paths_cache[user_id] = (now, authorized_paths)
+            logger.debug("🔑 Authorized paths for user %s: %s", user_id, authorized_paths)
             return authorized_paths
         except Exception as e:
-            print(f"❌ Error retrieving authorized paths for user {user_id}: {e}")
+            self._paths_cache.pop(user_id, None)
+            logger.error("❌ Error retrieving authorized paths for user %s: %s", user_id, e)
             return []
 
     
     def start_watching(self):
         """파일 감시 시작"""
-        class Handler(FileSystemEventHandler):
+        class Handler(PatternMatchingEventHandler):
+            # 같은 파일의 이벤트가 이 시간(초) 동안 더 오지 않으면 마지막 상태로 한 번만 처리 (trailing-edge)
+            DEBOUNCE_INTERVAL = 0.3
+            
             def __init__(self, watcher):
+                # 대상 확장자/임시 파일/디렉터리 필터링은 watchdog이 콜백 호출 전에 처리
+                super().__init__(
+                    patterns=[f"*{ext}" for ext in sorted(watcher.allowed_extensions)],
+                    ignore_patterns=WATCH_IGNORE_PATTERNS,
+                    ignore_directories=True,
+                    case_sensitive=False
+                )
                 self.watcher = watcher
+                self._pending = {}  # 경로 -> (합쳐진 이벤트 타입, threading.Timer)
+                self._debounce_lock = threading.Lock()
+            
+            @staticmethod
+            def _merge(prev, new):
+                """대기 중인 이벤트와 새 이벤트를 하나로 합침"""
+                if prev is None:
+                    return new
+                if new == 'delete':
+                    return 'delete'  # 삭제가 앞선 생성/수정을 대체
+                if prev == 'delete':
+                    return 'update'  # 삭제 후 다시 생성 (편집기의 rename 저장) -> 수정
+                if prev == 'create':
+                    return 'create'  # 생성 직후 수정 -> 생성 한 번
+                return new
+            
+            def _schedule(self, path, event_type):
+                with self._debounce_lock:
+                    prev_type, timer = self._pending.get(path, (None, None))
+                    if timer is not None:
+                        timer.cancel()
+                    timer = threading.Timer(self.DEBOUNCE_INTERVAL, self._dispatch, args=(path,))
+                    timer.daemon = True
+                    self._pending[path] = (self._merge(prev_type, event_type), timer)
+                    timer.start()
+            
+            def _dispatch(self, path):
+                with self._debounce_lock:
+                    event_type, _ = self._pending.pop(path, (None, None))
+                if event_type is None:
+                    return
+                # Update file structure in database (수정은 구조 변화 없음)
+                if event_type in ('create', 'delete'):
+                    rel_path = os.path.relpath(path, self.watcher.watch_folder)
+                    self.watcher._update_file_structure(rel_path, event_type)
+                # Send file to server
+                self.watcher._enqueue_event(path, event_type)
+            
+            def flush(self):
+                """대기 중인 이벤트를 타이머를 기다리지 않고 바로 처리 (종료시 사용)"""
+                with self._debounce_lock:
+                    pending = list(self._pending.items())
+                    for _, (_, timer) in pending:
+                        timer.cancel()
+                for path, _ in pending:
+                    self._dispatch(path)
+            
+            def _matches(self, path):
+                return match_any_paths([path], included_patterns=self.patterns,
+                                       excluded_patterns=self.ignore_patterns, case_sensitive=self.case_sensitive)
             
             def on_created(self, event):
-                if not event.is_directory and self.watcher._is_target_file(event.src_path):
-                    # Update file structure in database
-                    rel_path = os.path.relpath(event.src_path, self.watcher.watch_folder)
-                    self.watcher.auth_db.update_file_structure(rel_path, 'create')
-                    # Send file to server
-                    self.watcher._send_file(event.src_path, 'create')
+                self._schedule(event.src_path, 'create')
             
             def on_modified(self, event):
-                if not event.is_directory and self.watcher._is_target_file(event.src_path):
-                    self.watcher._send_file(event.src_path, 'update')
+                self._schedule(event.src_path, 'update')
             
             def on_deleted(self, event):
-                if not event.is_directory and self.watcher._is_target_file(event.src_path):
-                    # Update file structure in database
-                    rel_path = os.path.relpath(event.src_path, self.watcher.watch_folder)
-                    self.watcher.auth_db.update_file_structure(rel_path, 'delete')
-                    # Send file deletion to server
-                    self.watcher._send_file(event.src_path, 'delete')
+                self._schedule(event.src_path, 'delete')
+            
+            def on_moved(self, event):
+                # 편집기는 임시 파일에 쓴 뒤 대상 파일 이름으로 바꿔 저장하기도 함
+                if self._matches(event.src_path):
+                    self._schedule(event.src_path, 'delete')
+                if self._matches(event.dest_path):
+                    # 이미 전송한 적 있는 파일을 덮어쓴 경우는 수정, 아니면 생성
+                    rel_path = os.path.relpath(event.dest_path, self.watcher.watch_folder)
+                    self._schedule(event.dest_path, 'update' if rel_path in self.watcher._content_hash else 'create')
         
         # 감시 폴더 생성
         self.watch_folder.mkdir(exist_ok=True)
         
         # 이벤트 핸들러 등록
-        event_handler = Handler(self)
-        self.observer.schedule(event_handler, str(self.watch_folder), recursive=True)
+        self._event_handler = Handler(self)
+        self.observer.schedule(self._event_handler, str(self.watch_folder), recursive=True)
         
         # 감시 시작
         self.observer.start()
-        print(f"👀 폴더 감시 시작: {self.watch_folder}")
+        logger.info("👀 폴더 감시 시작: %s", self.watch_folder)
     
-    def start_router_server(self):
-        """ZeroMQ ROUTER 서버 시작"""
-        router_thread = threading.Thread(target=self._handle_file_request_router, daemon=True)
-        router_thread.start()
-        return router_thread
+    def start_servers(self):
+        """서버 루프 스레드 1개(파일 요청 중계 + access 처리)와 파일 요청 worker 스레드 router_workers개 시작"""
+        self._shutdown_event.clear()
+        
+        backend_socket = self._create_socket(zmq.DEALER, {zmq.LINGER: 0})
+        backend_socket.bind(FILE_WORKERS_ENDPOINT)
+        control_socket = self.context.socket(zmq.PAIR)
+        control_socket.bind(SERVER_CONTROL_ENDPOINT)
+        self._server_control = self.context.socket(zmq.PAIR)
+        self._server_control.connect(SERVER_CONTROL_ENDPOINT)
+        self._worker_shutdown = self._create_socket(zmq.PUB, {zmq.LINGER: 0})
+        self._worker_shutdown.bind(WORKER_SHUTDOWN_ENDPOINT)
+        
+        self._router_worker_threads = [
+            threading.Thread(target=self._handle_file_request_worker, daemon=True)
+            for _ in range(self.router_workers)
+        ]
+        for worker_thread in self._router_worker_threads:
+            worker_thread.start()
+        
+        server_thread = threading.Thread(target=self._server_loop,
+                                         args=(backend_socket, control_socket), daemon=True)
+        server_thread.start()
+        return server_thread
+    
+    def stop_servers(self, server_thread):
+        """서버 루프와 worker 스레드 종료"""
+        self._shutdown_event.set()
+        self._server_control.send(b'TERMINATE')
+        self._worker_shutdown.send(b'')
+        server_thread.join(timeout=1)
+        for worker_thread in self._router_worker_threads:
+            worker_thread.join(timeout=2)
+        self._server_control.close()
+        self._worker_shutdown.close()
+    
+    def stop(self, *_):
+        """start()의 대기를 끝내고 종료 절차를 시작 (시그널 핸들러로도 사용)"""
+        self._stop_event.set()
     
-    def start_access_server(self):
-        """ZeroMQ REP 서버 시작 (access 함수 처리용)"""
-        access_thread = threading.Thread(target=self._handle_access_request_rep, daemon=True)
-        access_thread.start()
-        return access_thread
-
     def start(self):
         """전체 시스템 시작"""
         print("=" * 50)
         print("🔮 DB Sorcerer File Watcher 시작")
         print("=" * 50)
         
-        # 파일 감시 시작
-        self.start_watching()
+        # Git 커밋 스레드 시작 (감시 이벤트보다 먼저)
+        if self.repo:
+            self.start_commit_worker()
         
-        # ZeroMQ Router 서버를 별도 스레드에서 시작
-        router_thread = self.start_router_server()
+        # Ctrl+C / 종료 시그널을 받으면 대기를 끝내고 정리
+        signal.signal(signal.SIGINT, self.stop)
+        if hasattr(signal, 'SIGTERM'):
+            signal.signal(signal.SIGTERM, self.stop)
+        
+        # 이벤트 처리 스레드 시작 후 파일 감시 시작
+        self.start_event_workers()
+        self.start_watching()
         
-        # ZeroMQ REP 서버를 별도 스레드에서 시작 (access 처리용)
-        access_thread = self.start_access_server()
+        # 파일 요청(ROUTER)과 access(REP)를 처리하는 서버 루프 시작
+        server_thread = self.start_servers()
         
         try:
             print("\n📋 사용 방법:")
             print(f"  • 감시 폴더: {self.watch_folder}")
             print(f"  • 지원 파일: {', '.join(self.allowed_extensions)}")
-            print(f"  • 파일 변경사항 전송: PUSH tcp://localhost:{self.push_port}")
-            print(f"  • 파일 요청 처리: ROUTER tcp://*:{self.router_port}")
+            print(f"  • 파일 변경사항 전송: PUSH {self.push_endpoint}")
+            print(f"  • 파일 요청 처리: ROUTER tcp://*:{self.router_port}" + (f", {ROUTER_IPC_ENDPOINT}" if IPC_AVAILABLE else ""))
             print(f"  • Access 권한 처리: REP tcp://*:{self.access_port}")
             if self.repo:
                 print(f"  • Git 저장소: 활성화됨")
-                print(f"  • Git 브랜치: {self.repo.active_branch.name}")
+                with self._repo_lock:
+                    branch = self.repo.head.shorthand if not self.repo.head_is_unborn else '(없음)'
+                print(f"  • Git 브랜치: {branch}")
             else:
                 print(f"  • Git 저장소: 비활성화됨")
             print("\n⏹️  종료하려면 Ctrl+C를 누르세요")
             print("-" * 50)
             
-            while True:
-                time.sleep(1)
+            # 종료 신호가 올 때까지 깨어나지 않고 대기
+            # (Windows에서는 Event.wait가 Ctrl+C로 중단되지 않으므로 1초마다 시그널 처리 기회를 줌)
+            wait_timeout = 1.0 if os.name == 'nt' else None
+            while not self._stop_event.wait(wait_timeout):
+                pass
                 
         except KeyboardInterrupt:
-            print("\n\n🛑 시스템 종료 중...")
-            self.router_running = False
-            self.access_running = False
-            self.observer.stop()
-            print("✅ 감시 종료 완료")
+            pass
+        
+        print("\n\n🛑 시스템 종료 중...")
+        self.observer.stop()
+        print("✅ 감시 종료 완료")
         
         self.observer.join()
-        if router_thread.is_alive():
-            router_thread.join(timeout=1)
-        if access_thread.is_alive():
-            access_thread.join(timeout=1)
+        # 디바운스 대기 중인 이벤트를 큐에 넣은 뒤 큐를 비우고 종료
+        self._event_handler.flush()
+        self.flush_deferred_sends()
+        self.stop_event_workers()
+        self._io_pool.shutdown(wait=True)
+        # 감시가 끝난 뒤 남은 변경사항을 모두 커밋 (종료시 커밋 유실 방지)
+        self.flush_commits()
+        self.stop_servers(server_thread)
         
-        # ZeroMQ 정리
+        # ZeroMQ 정리 (전송 중인 파일 요청 응답은 최대 2초까지 마저 보냄)
         self.push_socket.close()
-        self.router_socket.close()
+        self.router_socket.close(linger=2000)
         self.rep_socket.close()
         self.context.term()
 
 
 def main():
     """메인 실행 함수"""
+    log_listener = setup_logging(logging.INFO)
+    
     # 설정값들 (필요에 따라 수정)
     WATCH_FOLDER = "./test_files"
     PUSH_PORT = 5555  # 파일 변경사항 전송용 (PUSH 소켓)
@@ -524,7 +1396,11 @@ def main():
         access_port=ACCESS_PORT
     )
     
-    watcher.start()
+    try:
+        watcher.start()
+    finally:
+        # 큐에 남은 로그를 모두 출력하고 listener 스레드 종료
+        log_listener.stop()
 
 
 if __name__ == "__main__":